@@ -1,16 +1,10 @@
-import pandas as pd
-
 # Streamlit Component
 import streamlit as st
-
-# Other Library
-from datetime import datetime
-from pythainlp.util import thai_strftime
+from utils.assets import inject_css
 
 # ============================================================================================================================================ #
-# >> CSS Injection
-with open("style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+# >> CSS Injection (read once per process)
+inject_css("style.css")
 
 # >> Page and Navbar Configuration
 overview_page = st.Page('overview.py', title='ภาพรวมการทำงาน')
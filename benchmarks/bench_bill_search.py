@@ -0,0 +1,76 @@
+"""
+Build time and query latency of the bill title search index.
+
+Titles are synthetic, assembled from Thai dictionary words in the shape of
+real bill titles. Queries mix whole words, half-typed prefixes and typos.
+Run from the repository root:
+    python -m benchmarks.bench_bill_search --sizes 10000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from pythainlp.corpus import thai_words
+
+from utils.bill_search import BillSearchIndex
+
+PREFIXES = ['ร่างพระราชบัญญัติ', 'ร่างพระราชกำหนด', 'ญัตติ', 'ร่างข้อบังคับการประชุม', 'รายงานผลการพิจารณา']
+
+
+def make_titles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(sorted(w for w in thai_words() if 2 <= len(w) <= 10 and ' ' not in w))
+    topics = rng.choice(words, size=(n, 3))
+    prefixes = rng.choice(PREFIXES, size=n)
+    years = rng.integers(2562, 2569, size=n)
+    return [f'{p}{"".join(t)} พ.ศ. {y} (ฉบับที่ {i % 7 + 1})'
+            for i, (p, t, y) in enumerate(zip(prefixes, topics, years))]
+
+
+def make_queries(titles, n=200, seed=1):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for title in rng.choice(titles, size=n):
+        body = title.split(' ')[0]
+        start = rng.integers(0, max(len(body) - 8, 1))
+        piece = body[start:start + rng.integers(3, 9)]
+        kind = rng.integers(0, 3)
+        if kind == 1 and len(piece) > 3:
+            # typo: drop one character
+            cut = rng.integers(1, len(piece) - 1)
+            piece = piece[:cut] + piece[cut + 1:]
+        queries.append(piece)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.sizes:
+        titles = make_titles(n)
+        start = time.perf_counter()
+        index = BillSearchIndex(titles)
+        build = time.perf_counter() - start
+
+        latencies = []
+        for query in make_queries(titles):
+            start = time.perf_counter()
+            index.search(query, k=args.k)
+            latencies.append(time.perf_counter() - start)
+
+        latencies = np.array(latencies) * 1000
+        rows.append(dict(titles=n, terms=len(index.terms), build_seconds=round(build, 2),
+                         p50_ms=round(np.percentile(latencies, 50), 2),
+                         p95_ms=round(np.percentile(latencies, 95), 2),
+                         max_ms=round(latencies.max(), 2)))
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Compare the vectorized bubble packing engine against the original collapse.
+
+Run from the repository root:
+    python -m benchmarks.bench_bubble_packing
+    python -m benchmarks.bench_bubble_packing --sizes 100 500 --max-legacy 500
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from visualizations.absent_graph import BubbleChartPlotly
+from visualizations.bubble_packing import layout_quality
+
+
+def make_sizes(n, seed=0):
+    # Resample the real absence ratios so the radius distribution matches the app
+    sizes = pd.read_pickle('./data/ABSENT_RATIO.pkl')['size'].to_numpy()
+    return np.random.default_rng(seed).choice(sizes, size=n, replace=True)
+
+
+def run(n, legacy, plot_diameter=800, bubble_spacing=1):
+    chart = BubbleChartPlotly(
+        labels=[str(i) for i in range(n)],
+        area=make_sizes(n),
+        image_urls=[None] * n,
+        bubble_spacing=bubble_spacing,
+        plot_diameter=plot_diameter
+    )
+
+    start = time.perf_counter()
+    chart.collapse_legacy() if legacy else chart.collapse()
+    elapsed = time.perf_counter() - start
+
+    quality = layout_quality(chart.bubbles[:, :2], chart.bubbles[:, 2], spacing=bubble_spacing)
+    return dict(n=n, engine='legacy' if legacy else 'vectorized', seconds=round(elapsed, 3), **quality)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1000, 5000])
+    parser.add_argument('--max-legacy', type=int, default=None,
+                        help='skip the legacy collapse above this many bubbles (it is O(n^2) per iteration)')
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.sizes:
+        rows.append(run(n, legacy=False))
+        if args.max_legacy is None or n <= args.max_legacy:
+            rows.append(run(n, legacy=True))
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Load time and per-session memory of the pickle files vs the columnar,
+memory-mapped tables in utils/datastore.py.
+
+Each load runs in its own process, like one Streamlit server per worker.
+RssAnon is memory private to that process, RssFile is page-cache memory
+shared with every other process mapping the same files. Run from the
+repository root (Linux only, it reads /proc/self/status):
+    python -m benchmarks.bench_datastore --rows 2000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.datastore import read_table, write_table
+
+OPTIONS = ['เห็นด้วย', 'ไม่เห็นด้วย', 'งดออกเสียง', 'ไม่ลงคะแนนเสียง', 'ลา / ขาดลงมติ']
+RESULTS = ['ผ่าน', 'ไม่ผ่าน', None]
+
+
+def make_votes(rows, n_bills=2000, n_members=750, n_parties=40, seed=0):
+    """Synthetic table shaped like VOTE_RESULTS_2.pkl."""
+    rng = np.random.default_rng(seed)
+    bill = rng.integers(0, n_bills, rows)
+    member = rng.integers(0, n_members, rows)
+    start = np.datetime64('2019-05-24') + rng.integers(0, 2300, n_bills).astype('timedelta64[D]')
+    return pd.DataFrame({
+        'vote_id': np.arange(rows),
+        'title': pd.Series([f'ร่างพระราชบัญญัติฉบับที่ {b}' for b in range(n_bills)]).to_numpy()[bill],
+        'start_date': pd.to_datetime(start[bill]),
+        'result': np.array(RESULTS, dtype=object)[bill % len(RESULTS)],
+        'voter_name': pd.Series([f'สมาชิก {m}' for m in range(n_members)]).to_numpy()[member],
+        'voter_party': pd.Series([f'พรรค {p}' for p in range(n_parties)]).to_numpy()[member % n_parties],
+        'option': np.array(OPTIONS, dtype=object)[rng.integers(0, len(OPTIONS), rows)],
+    })
+
+
+def rss():
+    fields = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('RssAnon', 'RssFile'):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+
+def child(fmt, directory):
+    before = rss()
+    start = time.perf_counter()
+    if fmt == 'pickle':
+        df = pd.read_pickle(os.path.join(directory, 'VOTES.pkl'))
+    else:
+        df = read_table('VOTES', directory=directory)
+    load = time.perf_counter() - start
+
+    # What the detail page touches on a bill selection
+    start = time.perf_counter()
+    selected = df[df['title'] == df['title'].iloc[0]]
+    selected.groupby('option', observed=True)['vote_id'].count()
+    query = time.perf_counter() - start
+
+    after = rss()
+    print(json.dumps(dict(
+        format=fmt,
+        load_seconds=round(load, 4),
+        query_seconds=round(query, 4),
+        private_mib=round(after['RssAnon'] - before['RssAnon'], 1),
+        shared_mib=round(after['RssFile'] - before['RssFile'], 1),
+    )))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--sessions', type=int, default=3)
+    parser.add_argument('--child', nargs=2, metavar=('FORMAT', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        df = make_votes(args.rows)
+        df.to_pickle(os.path.join(directory, 'VOTES.pkl'))
+        write_table(df, 'VOTES', directory)
+        del df
+
+        rows = []
+        for fmt in ('pickle', 'columnar'):
+            for _ in range(args.sessions):
+                out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_datastore', '--child', fmt, directory],
+                                     check=True, capture_output=True, text=True).stdout
+                rows.append(json.loads(out))
+
+        print(f'{args.rows:,} vote rows, one process per session')
+        print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Drive ImageFetcher against a local stand-in image server and compare it with
+the old one-requests.get-per-bubble loop.
+
+The server answers every path with a small PNG after a fixed delay, makes
+/flaky/* fail once with a 503 and never answers /slow/* in time, so the run
+also checks de-duplication, retries and timeouts. Run from the repository
+root:
+    python -m benchmarks.bench_image_fetcher
+"""
+import argparse
+import io
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from PIL import Image
+
+from visualizations.image_fetcher import HostLatency, ImageFetcher
+
+
+def make_server(delay):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), '#2EC4B6').save(buffer, format='PNG')
+    body = buffer.getvalue()
+    hits = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            hits[self.path] += 1
+            if self.path.startswith('/slow/'):
+                time.sleep(delay * 50)
+            else:
+                time.sleep(delay)
+
+            if self.path.startswith('/flaky/') and hits[self.path] == 1:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=200, help='unique photos')
+    parser.add_argument('--missing', type=int, default=150, help='members sharing the placeholder URL')
+    parser.add_argument('--delay', type=float, default=0.02, help='server delay per request in seconds')
+    args = parser.parse_args()
+
+    server, hits = make_server(args.delay)
+    base = f'http://127.0.0.1:{server.server_port}'
+    urls = [f'{base}/people/{i}.png' for i in range(args.images)]
+    urls += [f'{base}/avatar/placeholder.png'] * args.missing
+    urls += [f'{base}/flaky/1.png', f'{base}/slow/1.png']
+
+    # Old behaviour: one unpooled request per bubble, no timeout
+    start = time.perf_counter()
+    for url in urls[:-1]:
+        requests.get(url)
+    sequential = time.perf_counter() - start
+    hits.clear()
+
+    latency = HostLatency()
+    start = time.perf_counter()
+    with ImageFetcher(max_workers=16, timeout=(1, args.delay * 10), retries=1, backoff=0.01,
+                      on_request=latency) as fetcher:
+        fetched, failed = fetcher.fetch_all(urls)
+    concurrent = time.perf_counter() - start
+
+    print(f'{len(urls)} bubbles, {len(set(urls))} unique URLs')
+    print(f'sequential requests.get (without the slow URL): {sequential:.2f}s')
+    print(f'ImageFetcher: {concurrent:.2f}s, {len(fetched)} fetched, {len(failed)} failed')
+    print(f"placeholder requested {hits['/avatar/placeholder.png']} time(s), "
+          f"flaky URL {hits['/flaky/1.png']} time(s)")
+    for host, stats in latency.summary().items():
+        print(f'  {host}: {stats}')
+
+    assert hits['/avatar/placeholder.png'] == 1, 'identical URLs must be fetched once'
+    assert f'{base}/flaky/1.png' in fetched, 'transient 503 must be retried'
+    assert list(failed) == [f'{base}/slow/1.png'], 'only the slow URL should time out'
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
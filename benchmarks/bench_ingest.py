@@ -0,0 +1,70 @@
+"""
+Ingest several batches in a row into a throw-away data directory and check
+the published tables after each one.
+
+ABSENT_RATIO starts as a columnar table (as after python -m utils.datastore),
+so from the first ingest on the absence counts are updated from read-only,
+memory-mapped columns. After every batch the TOTAL / ABSENT counts must equal
+the starting counts plus every vote ingested so far. Run from the repository
+root:
+    python -m benchmarks.bench_ingest --batches 3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_datastore import make_votes
+from benchmarks.bench_suite import make_absent
+from utils.datastore import convert_pickles, read_table
+from utils.ingest import ABSENT, ABSENT_OPTION, VOTES, ingest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=1341)
+    parser.add_argument('--batches', type=int, default=3, help='batches ingested one after another')
+    parser.add_argument('--rows', type=int, default=20 * 493, help='vote records per batch')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir, columnar_dir = os.path.join(directory, 'data'), os.path.join(directory, 'columnar')
+        os.makedirs(data_dir)
+        absent = make_absent(args.members)
+        absent.to_pickle(os.path.join(data_dir, f'{ABSENT}.pkl'))
+        convert_pickles(data_dir, columnar_dir, names=[ABSENT])
+
+        expected = absent.set_index('label')[['TOTAL', 'ABSENT']].astype(np.int64)
+        for i in range(args.batches):
+            # Batches after the first also vote on new bills and bring new members
+            batch = make_votes(args.rows, n_bills=20, n_members=args.members + 10 * i, seed=i + 1)
+            batch['title'] = batch['title'] + f' (ชุดที่ {i + 1})'
+
+            start = time.perf_counter()
+            summary = ingest([batch], directory=columnar_dir, data_dir=data_dir,
+                             batch_dir=os.path.join(directory, 'batches'), update_index=False)
+            print(f'batch {i + 1}: {summary} in {time.perf_counter() - start:.2f}s')
+
+            counts = pd.DataFrame({'TOTAL': 1, 'ABSENT': (batch['option'] == ABSENT_OPTION).astype(np.int64),
+                                   'label': batch['voter_name']}).groupby('label').sum()
+            expected = expected.add(counts, fill_value=0).astype(np.int64)
+
+            table = read_table(ABSENT, directory=columnar_dir).astype({'label': object}).set_index('label')
+            assert summary['version'] == i + 1, 'every batch must publish a new version'
+            assert table.index.is_unique, 'members must not be duplicated'
+            assert table[['TOTAL', 'ABSENT']].astype(np.int64).sort_index().equals(expected.sort_index()), \
+                'TOTAL / ABSENT must add up the starting counts and every batch'
+            assert np.allclose(table['size'], table['ABSENT'] / table['TOTAL']), 'size must be ABSENT / TOTAL'
+            assert len(read_table(VOTES, directory=columnar_dir)) == args.rows * (i + 1)
+
+        # The same batch again is a no-op
+        assert ingest([batch], directory=columnar_dir, data_dir=data_dir,
+                      batch_dir=os.path.join(directory, 'batches'), update_index=False)['rows'] == 0
+    print('ok')
+
+
+if __name__ == '__main__':
+    main()
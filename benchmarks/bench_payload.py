@@ -0,0 +1,94 @@
+"""
+Payload size of the overview's member bubble chart (Plotly JSON sent to the
+browser) per render mode, and a size budget check for the 500-member chart.
+
+  - svg:    the original per-bubble SVG, photo base64-encoded inside the SVG
+            and the SVG base64-encoded again
+  - images: visualizations/figure_payload.py, each distinct photo embedded
+            once as WebP at the size it is drawn at
+  - sprite: every photo composited into one image
+
+Photos are synthetic (a distinct noisy JPEG per member, a third of the
+members on the shared placeholder) and nothing is downloaded. Run from the
+repository root:
+    python -m benchmarks.bench_payload
+    python -m benchmarks.bench_payload --members 500 1341 --budget-kib 1024
+Exits with status 1 when the 'images' payload of the 500-member chart is over
+the budget.
+"""
+import argparse
+import hashlib
+import io
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from benchmarks.bench_suite import StubFetcher, make_absent, offline
+
+BUDGET_MEMBERS = 500
+
+
+class PhotoFetcher(StubFetcher):
+    """Every URL 'downloads' its own 200px portrait-like JPEG."""
+
+    def fetch_all(self, urls):
+        results = {}
+        for url in dict.fromkeys(urls):
+            rng = np.random.default_rng(int(hashlib.sha256(url.encode('utf-8')).hexdigest()[:8], 16))
+            yy, xx = np.mgrid[0:200, 0:200]
+            base = rng.integers(40, 200, 3)
+            img = (base + 0.3 * xx[..., None] + 0.2 * yy[..., None] + rng.normal(0, 12, (200, 200, 3)))
+            buffer = io.BytesIO()
+            Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(buffer, format='JPEG', quality=85)
+            results[url] = buffer.getvalue()
+        return results, {}
+
+
+def measure(members, render_mode, directory):
+    from visualizations.absent_graph import PLOT_DIAMETER, absent_members, plot_bubble_chart_with_images
+    from visualizations.figure_payload import payload_bytes
+
+    df = absent_members(make_absent(members))
+    with offline(directory, fetcher=PhotoFetcher):
+        start = time.perf_counter()
+        fig = plot_bubble_chart_with_images(df, plot_diameter=PLOT_DIAMETER, render_mode=render_mode)
+        seconds = time.perf_counter() - start
+    sources = [image.source for image in fig.layout.images if image.source]
+    sources += [image.source for image in fig.layout.template.layout.images if image.source]
+    return dict(members=members, render_mode=render_mode, payload_kib=round(payload_bytes(fig) / 1024, 1),
+                embedded_images=len(sources), build_seconds=round(seconds, 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', nargs='+', type=int, default=[BUDGET_MEMBERS])
+    parser.add_argument('--modes', nargs='+', default=['svg', 'images', 'sprite'], choices=['svg', 'images', 'sprite'])
+    parser.add_argument('--budget-kib', type=float, default=1024.0,
+                        help=f"largest allowed 'images' payload of the {BUDGET_MEMBERS}-member chart")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='politigraph-payload-')
+    rows = [measure(members, mode, directory) for members in args.members for mode in args.modes]
+    df = pd.DataFrame(rows)
+    print(df.to_string(index=False))
+
+    for members, group in df.groupby('members'):
+        kib = group.set_index('render_mode')['payload_kib']
+        if 'svg' in kib and 'images' in kib:
+            print(f'{members} members: {kib["svg"]:,.0f} KiB -> {kib["images"]:,.0f} KiB '
+                  f'({kib["images"] / kib["svg"]:.1%} of the svg payload)')
+
+    budget = df[(df['members'] == BUDGET_MEMBERS) & (df['render_mode'] == 'images')]
+    if not budget.empty:
+        kib = budget['payload_kib'].iloc[0]
+        print(f'Budget: {kib:,.0f} KiB of {args.budget_kib:,.0f} KiB for {BUDGET_MEMBERS} members')
+        if kib > args.budget_kib:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
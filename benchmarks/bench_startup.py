@@ -0,0 +1,96 @@
+"""
+Cold-start cost of each page: import time and time to first render.
+
+Every measurement runs in a fresh interpreter, like a newly scaled-up
+server process:
+  - imports: only the page's top-level import statements
+  - first render: the whole page script through streamlit's AppTest (no
+    browser), after streamlit itself is imported
+  - rerun: the same page rendered a second time in that process
+It also lists which heavy libraries the page pulled in (beyond what
+streamlit's test harness already imports). Run from
+the repository root (it renders the pages against ./data):
+    python -m benchmarks.bench_startup
+Warm the figure cache first (python -m visualizations.figure_cache) to
+measure what a visitor after a deploy sees.
+"""
+import argparse
+import ast
+import json
+import subprocess
+import sys
+
+import pandas as pd
+
+PAGES = ['app.py', 'overview.py', 'detail.py']
+HEAVY = ['pandas', 'plotly.express', 'pythainlp', 'bokeh', 'PIL', 'requests', 'streamlit_autocomplete']
+
+
+def _imports(page):
+    with open(page, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    return ast.unparse([node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))])
+
+
+def child(mode, page):
+    import time
+
+    if mode == 'imports':
+        code = _imports(page)
+        start = time.perf_counter()
+        exec(code, {})
+        print(json.dumps(dict(imports=time.perf_counter() - start)))
+        return
+
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    framework = time.perf_counter() - start
+    before = set(sys.modules)
+
+    start = time.perf_counter()
+    at = AppTest.from_file(page, default_timeout=600).run()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    at.run()
+    rerun = time.perf_counter() - start
+    print(json.dumps(dict(
+        streamlit=framework,
+        first_render=first,
+        rerun=rerun,
+        error=str(at.exception[0].message).splitlines()[0] if len(at.exception) else None,
+        loaded=','.join(m for m in HEAVY if m in sys.modules and m not in before),
+    )))
+
+
+def _run(mode, page):
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child', mode, page],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages', nargs='*', default=PAGES)
+    parser.add_argument('--repeat', type=int, default=3, help='fresh processes per page (median reported)')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PAGE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    rows = []
+    for page in args.pages:
+        runs = [dict(_run('imports', page), **_run('render', page)) for _ in range(args.repeat)]
+        df = pd.DataFrame(runs)
+        row = dict(page=page)
+        row.update({c: round(df[c].median(), 3) for c in ('imports', 'streamlit', 'first_render', 'rerun')})
+        row.update(heavy_modules=runs[-1]['loaded'], error=runs[-1]['error'])
+        rows.append(row)
+
+    print('Seconds, median of fresh processes')
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+"""
+Regression benchmarks for the visualization builders and data loaders.
+
+Runs without Streamlit and without network access: datasets are synthetic,
+shaped like ABSENT_RATIO.pkl (1341 members), VOTE_RESULTS.pkl (one vote,
+493 members) and VOTE_RESULTS_2 (many votes), at 1x, 10x and 100x scale.
+Photo downloads are answered by a stub fetcher and every cache points at a
+throw-away directory, so each case measures a cold build.
+
+For every case and scale the median wall time over --repeat runs and the
+peak traced memory of one extra run are recorded.
+
+    python -m benchmarks.bench_suite --save baseline.json
+    python -m benchmarks.bench_suite --compare baseline.json --threshold 0.25
+The comparison exits with status 1 when a case got slower (or used more
+memory) than the baseline by more than the threshold.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from benchmarks.bench_datastore import OPTIONS, make_votes
+
+ABSENT_MEMBERS = 1341
+VOTE_MEMBERS = 493
+ROLES = ['พรรคฝ่ายรัฐบาล', 'พรรคฝ่ายค้าน', 'สมาชิกวุฒิสภา']
+
+
+def make_absent(n, seed=0):
+    """Synthetic table shaped like ABSENT_RATIO.pkl (sorted by TOTAL, a third without photo)."""
+    rng = np.random.default_rng(seed)
+    total = np.sort(rng.integers(50, 400, n))[::-1]
+    absent = rng.binomial(total, rng.beta(2, 8, n))
+    labels = np.array([f'สมาชิก {i}' for i in range(n)], dtype=object)
+    image_url = np.array([f'https://example.invalid/people/{i}.webp' for i in range(n)], dtype=object)
+    image_url[rng.random(n) < 1 / 3] = None
+    return pd.DataFrame({
+        'voter_id': [f'{i:08x}-0000-0000-0000-000000000000' for i in range(n)],
+        'label': labels,
+        'image_url': image_url,
+        'ASSUMED_PARTY': np.array([f'พรรค {p}' for p in range(40)], dtype=object)[rng.integers(0, 40, n)],
+        'TOTAL': total,
+        'ABSENT': absent,
+        'size': absent / total,
+    })
+
+
+def make_vote_results(n, seed=0):
+    """Synthetic table shaped like VOTE_RESULTS.pkl."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'option': np.array(OPTIONS, dtype=object)[rng.integers(0, len(OPTIONS), n)],
+        'voter_name': [f'สมาชิก {i}' for i in range(n)],
+        'role': np.array(ROLES, dtype=object)[rng.integers(0, len(ROLES), n)],
+        'party': np.array([f'พรรค {p}' for p in range(40)], dtype=object)[rng.integers(0, 40, n)],
+    })
+
+
+class StubFetcher:
+    """Stands in for ImageFetcher: every URL 'downloads' the same small photo."""
+
+    def __init__(self, *args, **kwargs):
+        buf = io.BytesIO()
+        Image.new('RGB', (64, 64), (120, 140, 160)).save(buf, format='PNG')
+        self.data = buf.getvalue()
+
+    def fetch_all(self, urls):
+        return {url: self.data for url in dict.fromkeys(urls)}, {}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextlib.contextmanager
+def offline(directory, fetcher=StubFetcher):
+    """Stub photo downloads and point the avatar and layout caches at directory."""
+    import visualizations.absent_graph as absent_graph
+    import visualizations.avatar_store as avatar_store
+    from visualizations.layout_cache import layout_cache
+
+    saved = (avatar_store.ImageFetcher, absent_graph.avatar_store, layout_cache.directory)
+    avatar_store.ImageFetcher = fetcher
+    absent_graph.avatar_store = avatar_store.AvatarStore(os.path.join(directory, 'avatars'))
+    layout_cache.directory = os.path.join(directory, 'layouts')
+    try:
+        yield
+    finally:
+        avatar_store.ImageFetcher, absent_graph.avatar_store, layout_cache.directory = saved
+
+
+def _cold_caches():
+    from visualizations.layout_cache import layout_cache
+
+    layout_cache.clear(disk=True)
+
+
+# Cases: setup(scale, directory) returns the function to time. Setup is not timed.
+# Cases marked fixed do not depend on the data size and only run at 1x.
+
+def case_bubble_collapse(scale, directory):
+    from visualizations.absent_graph import BubbleChartPlotly
+
+    df = make_absent(ABSENT_MEMBERS * scale)
+
+    def run():
+        chart = BubbleChartPlotly(df['label'], df['size'], df['image_url'], bubble_spacing=1, plot_diameter=800)
+        chart.collapse()
+    return run
+
+
+def _bubble_chart(render_mode, min_image_radius=0):
+    def setup(scale, directory):
+        from visualizations.absent_graph import absent_members, plot_bubble_chart_with_images
+
+        df = absent_members(make_absent(ABSENT_MEMBERS * scale))
+
+        def run():
+            _cold_caches()
+            plot_bubble_chart_with_images(df, plot_diameter=800, render_mode=render_mode,
+                                          min_image_radius=min_image_radius)
+        return run
+    return setup
+
+
+def case_layout_batch(scale, directory):
+    # Responsive layouts: the member chart at four diameters, packed on the process pool
+    from visualizations.absent_graph import absent_members
+    from visualizations.layout_batch import batch_layouts
+
+    df = absent_members(make_absent(ABSENT_MEMBERS * scale))
+    return lambda: batch_layouts([(df, diameter, 1) for diameter in (400, 600, 800, 1000)], cache=None)
+
+
+def case_timeline(scale, directory):
+    from visualizations.timeline_gantt_chart import timeline_gantt_chart
+
+    return timeline_gantt_chart
+
+
+def case_overview_vote_ratio(scale, directory):
+    from visualizations.overview_vote_ratio import overview_vote_ratio
+
+    df = make_vote_results(VOTE_MEMBERS * scale)
+    colors = pd.DataFrame({'option': OPTIONS, 'color': ['#2EC4B6', '#E71D36', '#FF9F1C', '#00325A', '#7F8B92']})
+
+    def run():
+        pivoted_df = colors.copy()
+        pivoted_df['count'] = df['option'].value_counts().reindex(colors['option'], fill_value=0).to_numpy()
+        pivoted_df['dummy'] = 1
+        overview_vote_ratio(pivoted_df)
+    return run
+
+
+def _votes(scale):
+    # 20 votes of VOTE_MEMBERS members at 1x
+    return make_votes(20 * VOTE_MEMBERS * scale, n_bills=20 * scale, n_members=VOTE_MEMBERS)
+
+
+def case_detail_scan(scale, directory):
+    # The detail page before the vote index: filter the whole table, then group
+    df = _votes(scale)
+    title = df['title'].iloc[0]
+
+    def run():
+        selected = df[df['title'] == title]
+        selected.groupby('option')['vote_id'].count()
+        selected.groupby(['voter_party', 'option']).size()
+    return run
+
+
+def case_vote_index_build(scale, directory):
+    from utils.vote_index import VoteIndex
+
+    df = _votes(scale)
+    return lambda: VoteIndex().append(df)
+
+
+def case_detail_lookup(scale, directory):
+    from utils.vote_index import VoteIndex
+
+    df = _votes(scale)
+    index = VoteIndex().append(df)
+    bill_id = index.bill_id(df['title'].iloc[0])
+
+    def run():
+        index.tally(bill_id, OPTIONS)
+        index.party_tally(bill_id, OPTIONS)
+        df.iloc[index.rows(bill_id)]
+    return run
+
+
+def case_party_breakdown(scale, directory):
+    # Switching bill on the detail page: slice the bill x party x option array, draw both tabs
+    from utils.vote_index import VoteIndex
+    from visualizations.party_vote_breakdown import party_vote_breakdown
+
+    df = make_votes(20 * VOTE_MEMBERS * scale, n_bills=20 * scale, n_members=VOTE_MEMBERS, n_parties=300)
+    index = VoteIndex().append(df)
+    colors = pd.DataFrame({'option': OPTIONS, 'color': ['#2EC4B6', '#E71D36', '#FF9F1C', '#00325A', '#7F8B92']})
+    bill_id = index.bill_id(df['title'].iloc[0])
+
+    def run():
+        party_df = index.party_tally(bill_id, colors['option'])
+        party_vote_breakdown(party_df, colors)
+        party_vote_breakdown(party_df, colors, normalize=True)
+    return run
+
+
+def case_bill_export(scale, directory):
+    # Static export of one bill: the incremental check, then its HTML and JSON
+    from utils.static_export import bill_hash, render_bill
+    from utils.vote_index import VoteIndex
+
+    df = make_votes(20 * VOTE_MEMBERS * scale, n_bills=20 * scale, n_members=VOTE_MEMBERS, n_parties=300)
+    index = VoteIndex().append(df)
+    bill_id = index.bill_id(df['title'].iloc[0])
+
+    def run():
+        bill_hash(index, bill_id)
+        render_bill(index, bill_id)
+    return run
+
+
+def case_absence_index_build(scale, directory):
+    from utils.absence import AbsenceIndex
+
+    df = _votes(scale)
+    return lambda: AbsenceIndex(df)
+
+
+def case_absence_window(scale, directory):
+    # Moving the overview date-range slider: every member, party and chamber over a new window
+    from utils.absence import AbsenceIndex
+
+    index = AbsenceIndex(_votes(scale))
+    days = index.days
+
+    def run():
+        start, end = days[len(days) // 4], days[-len(days) // 4]
+        index.overall(start, end)
+        index.by_chamber(start, end)
+        index.by_party(start, end)
+        index.by_member(start, end)
+    return run
+
+
+def case_thai_strftime_rows(scale, directory):
+    # Thai date label of every vote, one pythainlp call per row
+    from pythainlp.util import thai_strftime
+
+    dates = _votes(scale)['start_date']
+    return lambda: [thai_strftime(d.to_pydatetime(), '%-d %b %Y') for d in dates]
+
+
+def case_thai_dates_column(scale, directory):
+    # The same labels from utils/thai_dates.py, a cold formatter each run
+    from utils.thai_dates import ThaiDateFormat
+
+    dates = _votes(scale)['start_date']
+    return lambda: ThaiDateFormat('%-d %b %Y').format(dates)
+
+
+def case_datastore_read(scale, directory):
+    from utils.datastore import read_table, write_table
+
+    write_table(_votes(scale), 'VOTES', directory)
+    return lambda: read_table('VOTES', directory=directory)['option'].value_counts()
+
+
+CASES = {
+    'bubble_collapse': (case_bubble_collapse, False),
+    'layout_batch': (case_layout_batch, False),
+    'bubble_chart_images': (_bubble_chart('images'), False),
+    'bubble_chart_sprite': (_bubble_chart('sprite'), False),
+    'bubble_chart_lod': (_bubble_chart('sprite', min_image_radius=8), False),
+    'timeline_gantt_chart': (case_timeline, True),
+    'overview_vote_ratio': (case_overview_vote_ratio, False),
+    'detail_scan': (case_detail_scan, False),
+    'vote_index_build': (case_vote_index_build, False),
+    'detail_lookup': (case_detail_lookup, False),
+    'party_breakdown': (case_party_breakdown, False),
+    'bill_export': (case_bill_export, False),
+    'absence_index_build': (case_absence_index_build, False),
+    'absence_window': (case_absence_window, False),
+    'thai_strftime_rows': (case_thai_strftime_rows, False),
+    'thai_dates_column': (case_thai_dates_column, False),
+    'datastore_read': (case_datastore_read, False),
+}
+
+
+# A case whose warm-up run takes longer than this is timed from that run alone
+# (100x bubble charts take about a minute per run)
+SLOW_SECONDS = 10.0
+
+
+def measure(run, repeat):
+    start = time.perf_counter()
+    run()  # warm-up: imports, first-call caches
+    times = [time.perf_counter() - start] if time.perf_counter() - start > SLOW_SECONDS else []
+    for _ in range(repeat if not times else 0):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return dict(seconds=statistics.median(times), min_seconds=min(times), peak_mib=peak / 2**20)
+
+
+def run_suite(cases, scales, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, offline(directory):
+        for name in cases:
+            setup, fixed = CASES[name]
+            for scale in scales:
+                if fixed and scale != 1:
+                    continue
+                result = measure(setup(scale, directory), repeat)
+                results[f'{name}@{scale}x'] = {k: round(v, 6) for k, v in result.items()}
+                print(f'{name:>22} {scale:>4}x  {result["seconds"] * 1000:10.1f} ms  '
+                      f'{result["peak_mib"]:8.1f} MiB peak', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold, memory_threshold, min_seconds):
+    """Rows of (case, metric, baseline, current, ratio, failed)."""
+    rows = []
+    for key, current in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        # Below min_seconds timings are mostly noise
+        if max(old['seconds'], current['seconds']) >= min_seconds:
+            ratio = current['seconds'] / max(old['seconds'], 1e-9)
+            rows.append((key, 'seconds', old['seconds'], current['seconds'], ratio, ratio > 1 + threshold))
+        ratio = current['peak_mib'] / max(old['peak_mib'], 1e-9)
+        rows.append((key, 'peak_mib', old['peak_mib'], current['peak_mib'], ratio,
+                     memory_threshold is not None and current['peak_mib'] > 1 and ratio > 1 + memory_threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', metavar='FILE', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%% (default)')
+    parser.add_argument('--memory-threshold', type=float, default=None, help='allowed peak memory growth')
+    parser.add_argument('--min-seconds', type=float, default=0.005, help='ignore timings below this')
+    args = parser.parse_args()
+
+    results = run_suite(args.cases, args.scales, args.repeat)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(dict(
+                created=datetime.now().isoformat(timespec='seconds'),
+                python=platform.python_version(),
+                machine=platform.platform(),
+                results=results,
+            ), f, indent=2)
+        print(f'Baseline written to {args.save}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        rows = compare(results, baseline, args.threshold, args.memory_threshold, args.min_seconds)
+        report = pd.DataFrame(rows, columns=['case', 'metric', 'baseline', 'current', 'ratio', 'regressed'])
+        print(report.round(4).to_string(index=False))
+        failed = report[report['regressed']]
+        if len(failed):
+            print(f'{len(failed)} regression(s) over the threshold')
+            sys.exit(1)
+        print('No regressions')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,53 +1,69 @@
-import pandas as pd
+# Data
+from utils.loaders import bill_search_index, vote_index
+from utils.bill_detail import metric_cards, status_badge, vote_colors, vote_tally
 
 # Visualization
 from visualizations.overview_vote_ratio import overview_vote_ratio
+from visualizations.party_vote_breakdown import party_vote_breakdown
 from visualizations.vote_metric_cards import metric_card
+# Background worker pool (utils/jobs.py)
+from utils.jobs import jobs
+# Profiling (?debug=1)
+from utils.tracing import debug_panel, span, start_run
 # Streamlit Component
 import streamlit as st
 from streamlit_autocomplete import st_textcomplete_autocomplete
+from utils.assets import inject_css
 
-# Other Library
-from datetime import datetime
-from pythainlp.util import thai_strftime
+# Thai dates, same output as pythainlp's thai_strftime
+from utils.thai_dates import thai_strftime_array
 
 # ============================================================================================================================================ #
-# >> CSS Injection
-with open("style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+# >> CSS Injection (read once per process)
+inject_css("style.css")
 
 # >> Set Page Layout
 st.set_page_config(page_title="Voting Details",
                    page_icon="📊",
                    layout='wide')
+start_run('detail')
+
+# Both indexes build on the worker pool, the search box only waits for its own
+search_job = jobs.submit('bill_search_index', bill_search_index)
+index_job = jobs.submit('vote_index', vote_index)
 
-with st.spinner('Loading data', show_time=True):
-    data_df = pd.read_pickle('./data/VOTE_RESULTS_2.pkl')
-    all_bill_name = list(data_df['title'].unique())
+with st.spinner('Loading data', show_time=True), span('wait bill_search_index'):
+    search_index = search_job.result()
 
 # User Input
 st.subheader(':material/search: ค้นหา')
-selected_bill = st.selectbox("เลือกร่างกฎหมายที่ต้องการ:", all_bill_name)
+# Ranked matches from the server-side index (utils/bill_search.py), only these are sent to the browser.
+# The text typed so far is already in session state when the page reruns.
+with span('bill search'):
+    matched_bills = search_index.search(st.session_state.get('bill_search_last_typed', ''), k=50)
+st_textcomplete_autocomplete("พิมพ์ชื่อร่างกฎหมาย:", options=matched_bills, key='bill_search',
+                             placeholder='เช่น ร่างพระราชบัญญัติ, งบประมาณ', height=68)
+if not matched_bills:
+    st.info('ไม่พบร่างกฎหมายที่ตรงกับคำค้นหา', icon=':material/search_off:')
+    debug_panel()
+    st.stop()
+selected_bill = st.selectbox("เลือกร่างกฎหมายที่ต้องการ:", matched_bills)
 st.divider()
 
 with st.spinner('Loading Data', show_time=True):
-    df = data_df[data_df['title'] == selected_bill]
-    # st.dataframe(df)
+    with span('wait vote_index'):
+        bill_index = index_job.result()
+
+    # Lookups into the precomputed per-bill index (utils/vote_index.py) instead of scanning the vote table
+    bill_id = bill_index.bill_id(selected_bill)
     
-    bill_title = df['title'].iloc[0]
+    bill_title = selected_bill
+    bill_result = bill_index.result(bill_id)
     
-    if df['result'].iloc[0] == 'ผ่าน':
-        bill_status = dict(text='ผ่าน', icon=':material/check:', color='green')
-    elif df['result'].iloc[0] == 'ไม่ผ่าน':
-        bill_status = dict(text='ไม่ผ่าน', icon=':material/close:', color='red')
-    elif pd.isna(df['result'].iloc[0]):
-        bill_status = dict(text='รอผลพิจารณา', icon=':material/hourglass:', color='violet')
-    else:
-        bill_status = dict(text=df['result'].iloc[0], icon=':material/info:', color='blue')
+    bill_status = status_badge(bill_result)
         
-    bill_date = thai_strftime(pd.to_datetime(df['start_date'].iloc[0]), fmt='%d %B %Y')
-    
-    bill_senate_only = df['voter_party'].unique()
+    with span('thai_strftime bill_date'):
+        bill_date = thai_strftime_array([bill_index.start_date(bill_id)], fmt='%d %B %Y')[0]
 
 #region # รายละเอียดของการลงมติ #######################################################################################################################
 st.header(bill_title)
@@ -58,29 +74,13 @@ st.markdown(f'**คำอธิบาย:** _ไม่มีคำอธิบ
 
 #region # สรุปคะแนนการลงมติ (ภาพรวม) ##################################################################################################################
 # Data
-color_df = pd.DataFrame([
-    dict(option='เห็นด้วย',           color='#2EC4B6'),
-    dict(option='ไม่เห็นด้วย',         color='#E71D36'),
-    dict(option='งดออกเสียง',        color='#FF9F1C'),
-    dict(option='ไม่ลงคะแนนเสียง',    color='#00325A'),
-    dict(option='ลา / ขาดลงมติ',     color='#7F8B92'),
-])
-
-pivoted_df = df.groupby(['option'], as_index=False)[['vote_id']].count().rename(columns={'vote_id': 'count'})
-
-pivoted_df = pd.merge(left=color_df, right=pivoted_df, how='left')
-pivoted_df['count'] = pivoted_df['count'].fillna(0)
-pivoted_df['dummy'] = 1
+color_df = vote_colors()
+pivoted_df = vote_tally(bill_index, bill_id, color_df)
 
 # Metric Card
-columns = st.columns(6)
-for i, col in enumerate(columns):
-    if i == 0: # องค์ประชุมรวม
-        with col:
-            metric_card('องค์ประชุม', f'{int(pivoted_df['count'].sum()):d}', f'คิดเป็นสัดส่วน 100.00%', border_left_color='#000000')
-    else:
-        with col:
-            metric_card(f'{pivoted_df['option'].iloc[i-1]}', f'{int(pivoted_df['count'].iloc[i-1]):d}', f'คิดเป็นสัดส่วน {pivoted_df['count'].iloc[i-1]*100/pivoted_df['count'].sum():.2f}%',  border_left_color=pivoted_df['color'].iloc[i-1])
+for col, card in zip(st.columns(6), metric_cards(pivoted_df)):
+    with col:
+        metric_card(**card)
 
 # Stacked Bar Chart
 viz_overview_stacked_bar_ratio = st.empty()
@@ -90,7 +90,8 @@ st.divider()
 with viz_overview_stacked_bar_ratio:
     with st.spinner('Loading Visualization', show_time=True):
         fig = overview_vote_ratio(pivoted_df)
-viz_overview_stacked_bar_ratio.plotly_chart(figure_or_data=fig, config = {'width': 'stretch'})
+with span('plotly_chart overview_vote_ratio'):
+    viz_overview_stacked_bar_ratio.plotly_chart(figure_or_data=fig, config = {'width': 'stretch'})
 
 #endregion ########################################################################################################################################
 
@@ -98,10 +99,19 @@ st.subheader('👥 ผลการลงมติรายสังกัด')
 
 tab1, tab2 = st.tabs(["แสดงผลตามจำนวนสมาชิก", "แสดงผลตามสัดส่วน"])
 
+# voter_party x option counts of this bill: a slice of the index's bill x party x option array
+party_df = bill_index.party_tally(bill_id, color_df['option'])
+
 with tab1:
-    pass
+    with st.spinner('Loading Visualization', show_time=True):
+        fig = party_vote_breakdown(party_df, color_df)
+    with span('plotly_chart party_vote_breakdown'):
+        st.plotly_chart(figure_or_data=fig, config = {'width': 'stretch'}, key='party_counts')
 
 with tab2:
-    pass
-
+    with st.spinner('Loading Visualization', show_time=True):
+        fig = party_vote_breakdown(party_df, color_df, normalize=True)
+    with span('plotly_chart party_vote_breakdown'):
+        st.plotly_chart(figure_or_data=fig, config = {'width': 'stretch'}, key='party_shares')
 
+debug_panel()
@@ -1,31 +1,38 @@
-import pandas as pd
+# Plotly Related Imports
+# Figures come from the figure cache, the builders only run on a miss (visualizations/figure_cache.py).
+# They are loaded on the background worker pool while the page lays out (utils/jobs.py)
+from visualizations.figure_cache import figure_from_json, submit_figure
+from utils.jobs import as_ready, jobs
 
-# Bokeh Related Imports
-from streamlit_bokeh import streamlit_bokeh
-from bokeh.plotting import figure
-from bokeh.models import ColumnDataSource, HoverTool
+# Absence analytics over a date window (utils/absence.py)
+from utils.loaders import absence_index, has_vote_records
+from visualizations.party_absence import party_absence_chart
+from visualizations.vote_metric_cards import metric_card
 
-# Plotly Related Imports
-from visualizations.absent_graph import absent_graph
-from visualizations.timeline_gantt_chart import timeline_gantt_chart
-# from visualizations.calendar_map import calendar_heatmap_chart
+# Profiling (?debug=1)
+from utils.tracing import debug_panel, span, start_run
 
 # Streamlit Component
 import streamlit as st
-
-# Other Library
-from datetime import datetime
-from pythainlp.util import thai_strftime
+from utils.assets import inject_css
 
 # ============================================================================================================================================ #
-# >> CSS Injection
-with open("style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+# >> CSS Injection (read once per process)
+inject_css("style.css")
 
 # >> Set Page Layout
 st.set_page_config(page_title="ภาพรวม",
                    page_icon="📊",
                    layout='wide')
+start_run('overview')
+
+# Start the figures that do not depend on any input right away
+# (the calendar and the date window need the vote records, there are none before the first ingest)
+figure_jobs = {submit_figure('timeline'): 'timeline'}
+vote_records = has_vote_records()
+if vote_records:
+    figure_jobs[submit_figure('calendar')] = 'calendar'
+    absence_job = jobs.submit('absence_index', absence_index)
 
 #region # Page Heading ############################################################################################################################
 st.header('ภาพรวมการทำงานของสมาชิกสภาผู้แทนราษฎรและสมาชิกวุฒิสภา')
@@ -37,6 +44,7 @@ st.divider()
 #region # Timeline ###############################################################################################################################
 st.subheader('วาระของสภาผู้แทนราษฎรและวุฒิสภา')
 viz_timeline = st.empty()
+viz_timeline.caption('Loading Visualization...')
 
 st.divider()
 #endregion ########################################################################################################################################
@@ -44,6 +52,10 @@ st.divider()
 #region # CALENDAR HEATMAP ###############################################################################################################################
 st.subheader('วาระของสภาผู้แทนราษฎรและวุฒิสภา')
 viz_calendar = st.empty()
+if vote_records:
+    viz_calendar.caption('Loading Visualization...')
+else:
+    viz_calendar.info('ยังไม่มีข้อมูลการลงมติ')
 
 st.divider()
 #endregion ########################################################################################################################################
@@ -53,35 +65,79 @@ st.subheader('อัตราการลาหรือขาดประชุ
 st.warning(f"""**หมายเหตุ:** อัตราการลาหรือขาดประชุมของสมาชิก อาจเกิดขึ้นจากหลายสาเหตุ เช่น การติดภารกิจอื่น การลาป่วย หรือเหตุผลส่วนตัวอื่น ๆ 
         **จึงไม่ได้สะท้อนถึงความไม่รับผิดชอบของสมาชิกเสมอไป**""", icon=':material/warning:')
 
+# Sitting days in the vote records, any window between them is one subtraction per member
+if vote_records:
+    with span('wait absence_index'):
+        absences = absence_job.result()
+    vote_records = len(absences.days) > 0
+if vote_records:
+    first_day, last_day = absences.days[0].astype(object), absences.days[-1].astype(object)
+    window = st.slider('ช่วงวันที่ประชุม', min_value=first_day, max_value=last_day, value=(first_day, last_day),
+                       format='DD/MM/YYYY', key='absence_window')
+
+    # The full range is the default figure, already in the figure cache
+    start = None if window[0] <= first_day else window[0].isoformat()
+    end = None if window[1] >= last_day else window[1].isoformat()
+    with span('absence overall'):
+        overall = absences.overall(start, end)
+    # Nobody absent in the window leaves nothing to draw
+    if overall['ABSENT']:
+        figure_jobs[submit_figure('absent_graph', render_mode='sprite', start=start, end=end)] = 'absent_graph'
+else:
+    # No vote records yet: only the all-time ABSENT_RATIO bubble chart, no date window
+    figure_jobs[submit_figure('absent_graph', render_mode='sprite')] = 'absent_graph'
+
 columns = st.columns(3)
 
 with columns[0]:
     st.markdown('#### ภาพรวม')
+    if not vote_records:
+        st.info('ยังไม่มีข้อมูลการลงมติ')
+    else:
+        with span('absence by_chamber'):
+            chambers = absences.by_chamber(start, end)
+        metric_card('ทั้งหมด', f'{overall["size"]:.2%}',
+                    f'ลา / ขาดลงมติ {overall["ABSENT"]:,d} จาก {overall["TOTAL"]:,d} ครั้ง ใน {overall["days"]:,d} วันประชุม',
+                    border_left_color='#000000')
+        for _, row in chambers.iterrows():
+            metric_card(row['chamber'], f'{row["size"]:.2%}',
+                        f'ลา / ขาดลงมติ {row["ABSENT"]:,d} จาก {row["TOTAL"]:,d} ครั้ง ({row["members"]:,d} คน)',
+                        border_left_color='#d62728')
 
 with columns[1]:
     st.markdown('#### รายสมาชิก')
     viz_packed_bubble_chart = st.empty()
+    if not vote_records or overall['ABSENT']:
+        viz_packed_bubble_chart.caption('Loading Visualization...')
+    elif overall['TOTAL']:
+        viz_packed_bubble_chart.info('ไม่มีการลาหรือขาดลงมติในช่วงวันที่ที่เลือก')
+    else:
+        viz_packed_bubble_chart.info('ไม่มีการลงมติในช่วงวันที่ที่เลือก')
     
 with columns[2]:
     st.markdown('#### รายสังกัด')
+    if not vote_records:
+        st.info('ยังไม่มีข้อมูลการลงมติ')
+    else:
+        with span('absence by_party'):
+            party_absences = absences.by_party(start, end)
+        if party_absences.empty:
+            st.info('ไม่มีการลงมติในช่วงวันที่ที่เลือก')
+        else:
+            st.plotly_chart(party_absence_chart(party_absences), config={'width': 'stretch'}, key='party_absence')
     
 
 st.divider()
 #endregion ########################################################################################################################################
 
-# Render Visualization
-with viz_timeline:
-    with st.spinner('Loading Visualization', show_time=True):
-        fig = timeline_gantt_chart()
-viz_timeline.plotly_chart(figure_or_data=fig, config = {'width': 'stretch'})
-
-# with viz_calendar:
-    # with st.spinner('Loading Visualization', show_time=True):
-        # fig = calendar_heatmap_chart()
-# viz_calendar.plotly_chart(figure_or_data=fig, config = {'width': 'stretch'})
-
-with viz_packed_bubble_chart:
-    with st.spinner('Loading Visualization', show_time=True):
-        fig = absent_graph()
-viz_packed_bubble_chart.plotly_chart(figure_or_data=fig, config = {'width': 'stretch',
-                                                                   'dragMode': 'pan'})
\ No newline at end of file
+# Render Visualization, each placeholder as soon as its figure is ready
+placeholders = dict(timeline=viz_timeline, calendar=viz_calendar, absent_graph=viz_packed_bubble_chart)
+configs = dict(absent_graph={'width': 'stretch', 'dragMode': 'pan'})
+
+with span('wait figures'):
+    for name, text in as_ready(figure_jobs):
+        fig = figure_from_json(name, text)
+        with span(f'plotly_chart {name}'):
+            placeholders[name].plotly_chart(figure_or_data=fig, config=configs.get(name, {'width': 'stretch'}))
+
+debug_panel()
\ No newline at end of file
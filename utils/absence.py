@@ -0,0 +1,103 @@
+"""
+Absence rates per member, party and chamber over any date window, computed
+from the raw vote records (VOTE_RESULTS_2) instead of the ABSENT_RATIO.pkl
+snapshot.
+
+Votes are counted once into a member x sitting-day matrix, kept as prefix
+sums along the days. The votes (and absences) of every member between two
+dates are then one subtraction per member, so a date-range slider can move
+freely without touching the vote table again.
+"""
+import numpy as np
+import pandas as pd
+
+ABSENT_OPTION = 'ลา / ขาดลงมติ'
+HOUSE, SENATE = 'สภาผู้แทนราษฎร', 'วุฒิสภา'
+
+
+def chamber_of(parties):
+    # Senators are filed under a "สมาชิกวุฒิสภา" party
+    parties = pd.Series(parties, dtype=object).fillna('')
+    return np.where(parties.str.startswith('สมาชิกวุฒิสภา'), SENATE, HOUSE)
+
+
+class AbsenceIndex:
+
+    def __init__(self, df):
+        key = 'voter_id' if 'voter_id' in df.columns else 'voter_name'
+        dates = pd.to_datetime(df['start_date']).to_numpy(dtype='datetime64[D]')
+        valid = ~np.isnat(dates) & df[key].notna().to_numpy()
+
+        member, member_keys = pd.factorize(df[key].astype(object)[valid])
+        self.days, day = np.unique(dates[valid], return_inverse=True)
+        n_members, n_days = len(member_keys), len(self.days)
+
+        # Latest name / party of every member
+        latest = pd.DataFrame({'member': member, 'label': df['voter_name'].astype(object).to_numpy()[valid],
+                               'party': df['voter_party'].astype(object).to_numpy()[valid]})
+        latest = latest.drop_duplicates('member', keep='last').set_index('member').sort_index()
+        self.members = pd.DataFrame({
+            key: np.asarray(member_keys, dtype=object),
+            'label': latest['label'].to_numpy(),
+            'party': latest['party'].to_numpy(),
+        })
+        self.members['chamber'] = chamber_of(self.members['party'])
+        self.key = key
+        self.party_codes, self.parties = pd.factorize(self.members['party'].fillna('-'))
+
+        # member x day counts, then prefix sums along the days (column 0 is all zeros)
+        cell = member.astype(np.int64) * n_days + day
+        absent = (df['option'].astype(object).to_numpy()[valid] == ABSENT_OPTION)
+        shape = (n_members, n_days)
+        total = np.bincount(cell, minlength=n_members * n_days).reshape(shape)
+        missed = np.bincount(cell[absent], minlength=n_members * n_days).reshape(shape)
+        self.total_prefix = np.zeros((n_members, n_days + 1), dtype=np.int32)
+        self.absent_prefix = np.zeros((n_members, n_days + 1), dtype=np.int32)
+        np.cumsum(total, axis=1, out=self.total_prefix[:, 1:])
+        np.cumsum(missed, axis=1, out=self.absent_prefix[:, 1:])
+
+    # Windows ################################################################################################
+
+    def _bounds(self, start=None, end=None):
+        """Day columns [d0, d1) of the sitting days between start and end, both inclusive."""
+        d0 = 0 if start is None else np.searchsorted(self.days, np.datetime64(pd.Timestamp(start), 'D'), 'left')
+        d1 = len(self.days) if end is None else np.searchsorted(self.days, np.datetime64(pd.Timestamp(end), 'D'), 'right')
+        return d0, max(d0, d1)
+
+    def counts(self, start=None, end=None):
+        """(votes, absences) of every member between start and end."""
+        d0, d1 = self._bounds(start, end)
+        return (self.total_prefix[:, d1] - self.total_prefix[:, d0],
+                self.absent_prefix[:, d1] - self.absent_prefix[:, d0])
+
+    def by_member(self, start=None, end=None):
+        """Members who voted in the window, shaped like ABSENT_RATIO (most votes first)."""
+        total, absent = self.counts(start, end)
+        df = self.members.assign(TOTAL=total, ABSENT=absent)
+        df = df[df['TOTAL'] > 0].rename(columns={'party': 'ASSUMED_PARTY'})
+        df['size'] = df['ABSENT'] / df['TOTAL']
+        return df.sort_values('TOTAL', ascending=False, kind='stable', ignore_index=True)
+
+    def _grouped(self, codes, labels, start, end, name):
+        total, absent = self.counts(start, end)
+        totals = np.bincount(codes, weights=total, minlength=len(labels))
+        absents = np.bincount(codes, weights=absent, minlength=len(labels))
+        members = np.bincount(codes, weights=total > 0, minlength=len(labels))
+        df = pd.DataFrame({name: labels, 'members': members.astype(int), 'TOTAL': totals.astype(int),
+                           'ABSENT': absents.astype(int)})
+        df = df[df['TOTAL'] > 0]
+        df['size'] = df['ABSENT'] / df['TOTAL']
+        return df.sort_values('size', ascending=False, ignore_index=True)
+
+    def by_party(self, start=None, end=None):
+        return self._grouped(self.party_codes, np.asarray(self.parties, dtype=object), start, end, 'party')
+
+    def by_chamber(self, start=None, end=None):
+        codes, labels = pd.factorize(self.members['chamber'])
+        return self._grouped(codes, np.asarray(labels, dtype=object), start, end, 'chamber')
+
+    def overall(self, start=None, end=None):
+        total, absent = self.counts(start, end)
+        return dict(TOTAL=int(total.sum()), ABSENT=int(absent.sum()),
+                    size=absent.sum() / total.sum() if total.sum() else 0.0,
+                    days=int(np.subtract(*self._bounds(start, end)[::-1])))
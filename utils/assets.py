@@ -0,0 +1,16 @@
+"""
+Static files the pages inject on every rerun, read from disk once per process.
+"""
+from functools import lru_cache
+
+import streamlit as st
+
+
+@lru_cache(maxsize=None)
+def read_asset(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def inject_css(path='style.css'):
+    st.markdown(f"<style>{read_asset(path)}</style>", unsafe_allow_html=True)
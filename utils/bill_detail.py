@@ -0,0 +1,48 @@
+"""
+The parts of a bill's detail view that do not need Streamlit, shared by the
+detail page and the static export (utils/static_export.py).
+"""
+import pandas as pd
+
+# Vote options in display order and their colors
+VOTE_COLORS = [
+    ('เห็นด้วย',           '#2EC4B6'),
+    ('ไม่เห็นด้วย',         '#E71D36'),
+    ('งดออกเสียง',        '#FF9F1C'),
+    ('ไม่ลงคะแนนเสียง',    '#00325A'),
+    ('ลา / ขาดลงมติ',     '#7F8B92'),
+]
+
+
+def vote_colors():
+    return pd.DataFrame(VOTE_COLORS, columns=['option', 'color'])
+
+
+def status_badge(result):
+    """Badge text, icon and color of a bill's result."""
+    if result == 'ผ่าน':
+        return dict(text='ผ่าน', icon=':material/check:', color='green')
+    elif result == 'ไม่ผ่าน':
+        return dict(text='ไม่ผ่าน', icon=':material/close:', color='red')
+    elif pd.isna(result):
+        return dict(text='รอผลพิจารณา', icon=':material/hourglass:', color='violet')
+    else:
+        return dict(text=result, icon=':material/info:', color='blue')
+
+
+def vote_tally(bill_index, bill_id, color_df):
+    """color_df with the bill's vote count per option, the input of overview_vote_ratio()."""
+    pivoted_df = color_df.copy()
+    pivoted_df['count'] = bill_index.tally(bill_id, color_df['option']).to_numpy()
+    pivoted_df['dummy'] = 1
+    return pivoted_df
+
+
+def metric_cards(pivoted_df):
+    """Arguments of the metric_card() row: the quorum, then one card per option."""
+    total = pivoted_df['count'].sum()
+    cards = [dict(label='องค์ประชุม', value=f'{int(total):d}', delta='คิดเป็นสัดส่วน 100.00%', border_left_color='#000000')]
+    for option, count, color in zip(pivoted_df['option'], pivoted_df['count'], pivoted_df['color']):
+        cards.append(dict(label=f'{option}', value=f'{int(count):d}', delta=f'คิดเป็นสัดส่วน {count*100/total:.2f}%',
+                          border_left_color=color))
+    return cards
@@ -0,0 +1,140 @@
+"""
+Server-side bill title search.
+
+Titles are split into Thai words with pythainlp's word tokenizer and kept in
+an inverted index over a sorted vocabulary, so a query word matches exactly,
+as a prefix (the word still being typed) or fuzzily (character bigram
+similarity, for typos). Only the top-k titles are sent to the browser.
+"""
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+from pythainlp.tokenize import word_tokenize
+
+# Score multipliers for the three kinds of match
+EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.5
+MIN_SIMILARITY = 0.6
+
+
+@lru_cache(maxsize=65536)
+def _tokenize_chunk(chunk):
+    # Titles repeat a lot of chunks ("ร่างพระราชบัญญัติ...", "พ.ศ.", years),
+    # so tokenizing whitespace-separated chunks once each saves most of the work
+    return tuple(t for t in word_tokenize(chunk, engine='newmm', keep_whitespace=False) if t.strip())
+
+
+def tokenize(text):
+    tokens = []
+    for chunk in str(text).lower().split():
+        tokens.extend(_tokenize_chunk(chunk))
+    return tokens
+
+
+def _bigrams(term):
+    return {term[i:i + 2] for i in range(len(term) - 1)} or {term}
+
+
+def _csr(lists, size):
+    """Flatten a list of id lists into (offsets, ids)."""
+    lengths = np.fromiter((len(x) for x in lists), dtype=np.int64, count=size)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    ids = np.fromiter((i for x in lists for i in x), dtype=np.int32, count=offsets[-1])
+    return offsets, ids
+
+
+class BillSearchIndex:
+
+    def __init__(self, titles):
+        self.titles = list(titles)
+        self._lower = [str(t).lower() for t in self.titles]
+
+        postings = {}
+        for title_id, title in enumerate(self.titles):
+            for token in set(tokenize(title)):
+                postings.setdefault(token, []).append(title_id)
+
+        # Sorted vocabulary: every term sharing a prefix sits in one contiguous
+        # range, and so do its postings
+        self.terms = sorted(postings)
+        self.post_offsets, self.post_titles = _csr([postings[t] for t in self.terms], len(self.terms))
+        df = np.diff(self.post_offsets)
+        self.idf = np.log1p(len(self.titles) / np.maximum(df, 1))
+
+        grams = {}
+        for term_id, term in enumerate(self.terms):
+            for gram in _bigrams(term):
+                grams.setdefault(gram, []).append(term_id)
+        self._grams = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in grams.items()}
+        self._gram_counts = np.array([len(_bigrams(t)) for t in self.terms], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def _prefix_range(self, prefix):
+        lo = bisect_left(self.terms, prefix)
+        hi = bisect_left(self.terms, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def _fuzzy_terms(self, term):
+        grams = [self._grams[g] for g in _bigrams(term) if g in self._grams]
+        if not grams:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        common = np.bincount(np.concatenate(grams), minlength=len(self.terms))
+        candidates = np.flatnonzero(common)
+        similarity = 2 * common[candidates] / (len(_bigrams(term)) + self._gram_counts[candidates])
+        keep = similarity >= MIN_SIMILARITY
+        return candidates[keep], similarity[keep]
+
+    def _term_scores(self, term, scores):
+        """Add the best match of term in every title to scores."""
+        best = np.zeros(len(self.titles))
+        lo, hi = self._prefix_range(term)
+
+        # Prefix matches (the exact term, if present, is the first of the range)
+        if hi > lo:
+            weights = np.full(hi - lo, PREFIX) * self.idf[lo:hi]
+            if self.terms[lo] == term:
+                weights[0] = EXACT * self.idf[lo]
+            start, end = self.post_offsets[lo], self.post_offsets[hi]
+            np.maximum.at(best, self.post_titles[start:end],
+                          np.repeat(weights, np.diff(self.post_offsets[lo:hi + 1])))
+
+        # Typos: only when the term has no exact match
+        if len(term) >= 3 and not (hi > lo and self.terms[lo] == term):
+            term_ids, similarity = self._fuzzy_terms(term)
+            outside = (term_ids < lo) | (term_ids >= hi)
+            term_ids, similarity = term_ids[outside], similarity[outside]
+            if len(term_ids):
+                lengths = self.post_offsets[term_ids + 1] - self.post_offsets[term_ids]
+                ids = np.concatenate([self.post_titles[self.post_offsets[t]:self.post_offsets[t + 1]] for t in term_ids])
+                np.maximum.at(best, ids, np.repeat(FUZZY * similarity * self.idf[term_ids], lengths))
+
+        scores += best
+
+    def search(self, query, k=10):
+        """Top-k titles for query, best first. An empty query returns the first k titles."""
+        query = str(query or '').strip().lower()
+        if not query:
+            return self.titles[:k]
+
+        # Tokens of the query, plus every whitespace chunk as a whole so a
+        # half-typed Thai word still matches as a prefix
+        terms = set(tokenize(query)) | set(query.split())
+        scores = np.zeros(len(self.titles))
+        for term in terms:
+            self._term_scores(term, scores)
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) == 0:
+            return []
+        if len(candidates) > 4 * k:
+            candidates = candidates[np.argpartition(-scores[candidates], 4 * k)[:4 * k]]
+
+        # Re-rank the shortlist: literal substring hits first, then score,
+        # then shorter titles
+        def rank(i):
+            title = self._lower[i]
+            return (query not in title, not title.startswith(query), -scores[i], len(title))
+
+        return [self.titles[i] for i in sorted(candidates, key=rank)[:k]]
@@ -0,0 +1,250 @@
+"""
+Columnar, memory-mapped storage for the datasets in ./data.
+
+Every table is a directory with one .npy file per column and a meta.json
+describing how to rebuild the DataFrame:
+  - text columns are dictionary-encoded: the smallest integer code array
+    that fits, plus the list of distinct values (-1 marks a missing value)
+  - integer columns are narrowed to the smallest dtype that holds them on
+    disk, and read back as the dtype they were written with (arithmetic on
+    an int8 column would overflow silently)
+  - date columns without a time of day are stored as int32 day numbers
+Columns are opened with numpy's mmap_mode, so every process reading the same
+table shares the same page-cache pages instead of holding a private copy,
+and only the columns that are asked for are touched.
+
+Convert the existing pickles once with:
+    python -m utils.datastore
+
+Tables refreshed by utils/ingest.py are written as new versioned directories
+(<name>@<version>) and published all at once by replacing manifest.json, so
+readers keep getting the previous version until the new one is committed.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.files import atomic_directory
+from utils.manifest import COLUMNAR_DIR, DATA_DIR, read_manifest, table_path, write_manifest
+
+FORMAT_VERSION = 1
+
+
+def _smallest_int(values):
+    lo, hi = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+def _encode_column(series):
+    """
+    Return (array, meta) for one column, see the module docstring.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series.to_numpy(dtype=bool), dict(kind='bool')
+
+    if pd.api.types.is_integer_dtype(series.dtype):
+        values = series.to_numpy()
+        return values.astype(_smallest_int(values)), dict(kind='int', dtype=str(values.dtype))
+
+    if pd.api.types.is_float_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64), dict(kind='float')
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if getattr(series.dt, 'tz', None) is not None:
+            raise TypeError(f'column {series.name!r}: timezone-aware dates are not supported')
+        values = series.to_numpy(dtype='datetime64[ns]')
+        missing = np.isnat(values)
+        days = values.astype('datetime64[D]')
+        if (days[~missing] == values[~missing]).all():
+            codes = days.astype(np.int64)
+            codes[missing] = np.iinfo(np.int32).min
+            return codes.astype(np.int32), dict(kind='date')
+        return values.astype('datetime64[s]'), dict(kind='datetime')
+
+    values = series.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    if not all(isinstance(v, str) for v in values[~missing]):
+        raise TypeError(f'column {series.name!r}: only text, number, bool and date columns are supported')
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    return codes.astype(_smallest_int(np.array([-1, len(uniques)]))), dict(kind='dictionary', dictionary=list(uniques))
+
+
+def _decode_column(array, meta):
+    kind = meta['kind']
+    if kind == 'dictionary':
+        return pd.Categorical.from_codes(array, categories=meta['dictionary'], validate=False)
+    if kind == 'date':
+        missing = array == np.iinfo(np.int32).min
+        values = array.astype('datetime64[D]').astype('datetime64[s]')
+        values[missing] = np.datetime64('NaT')
+        return values
+    if kind == 'int':
+        # A copy when the column was narrowed, still memory-mapped otherwise
+        return array.astype(meta['dtype'], copy=False)
+    return array
+
+
+def _append_column(array, meta, series):
+    """
+    Return (array, meta) for an existing column with series appended. Text
+    keeps its dictionary (new values go to the end, old codes stay valid).
+    """
+    if meta['kind'] == 'dictionary':
+        values = series.astype(object).to_numpy()
+        missing = pd.isna(values)
+        if all(isinstance(v, str) for v in values[~missing]):
+            dictionary = list(meta['dictionary'])
+            codes = pd.Index(dictionary, dtype=object).get_indexer(values)
+            new = pd.unique(values[(codes == -1) & ~missing])
+            if len(new):
+                dictionary.extend(new)
+                codes = pd.Index(dictionary, dtype=object).get_indexer(values)
+            codes[missing] = -1
+            dtype = _smallest_int(np.array([-1, len(dictionary)]))
+            return np.concatenate([array, codes]).astype(dtype), dict(meta, dictionary=dictionary)
+    else:
+        new, new_meta = _encode_column(series)
+        if new_meta['kind'] == meta['kind']:
+            return np.concatenate([array, new]), dict(meta, **new_meta)
+
+    # Different kind (e.g. times of day in a date column): re-encode the whole column
+    return _encode_column(pd.concat([pd.Series(_decode_column(array, meta)), series.reset_index(drop=True)],
+                                    ignore_index=True).rename(series.name))
+
+
+# Tables #####################################################################################################
+
+def _write_columns(target, columns, rows, replace=True):
+    with atomic_directory(target, replace) as tmp:
+        metas = []
+        for i, (name, array, meta) in enumerate(columns):
+            file = f'c{i}.npy'
+            np.save(os.path.join(tmp, file), np.ascontiguousarray(array), allow_pickle=False)
+            metas.append(dict(meta, name=name, file=file))
+
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(dict(version=FORMAT_VERSION, rows=rows, columns=metas), f, ensure_ascii=False)
+    return target
+
+
+def write_table(df, name, directory=COLUMNAR_DIR, version=None):
+    """
+    Store df as a columnar table. The new version is written next to the old
+    one and swapped in, readers that still map the old files keep working.
+
+    With version, df goes to its own <name>@<version> directory instead, to be
+    published later with write_manifest().
+    """
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        raise ValueError('reset_index() first, only a default RangeIndex is stored')
+
+    columns = [(name_, *_encode_column(df[name_])) for name_ in df.columns]
+    if version is not None:
+        return _write_columns(table_path(name, directory, version), columns, len(df))
+
+    target = _write_columns(os.path.join(directory, name), columns, len(df))
+    # A plain write replaces whatever an ingest had published for this table
+    manifest = read_manifest(directory)
+    if manifest['tables'].pop(name, None) is not None:
+        write_manifest(manifest, directory)
+    return target
+
+
+def append_table(df, name, version, directory=COLUMNAR_DIR):
+    """
+    Write <name>@<version>: the published table with the rows of df appended.
+    Columns are extended rather than re-encoded, so the cost is copying the
+    arrays, not rebuilding them.
+    """
+    meta = read_meta(name, directory)
+    path = table_path(name, directory)
+    if list(df.columns) != [c['name'] for c in meta['columns']]:
+        raise ValueError(f'{name}: appended columns {list(df.columns)} do not match the table')
+
+    columns = []
+    for c in meta['columns']:
+        array = np.load(os.path.join(path, c['file']), mmap_mode='r', allow_pickle=False)
+        column_meta = {k: v for k, v in c.items() if k not in ('name', 'file')}
+        columns.append((c['name'], *_append_column(array, column_meta, df[c['name']])))
+    return _write_columns(table_path(name, directory, version), columns, meta['rows'] + len(df))
+
+
+def read_meta(name, directory=COLUMNAR_DIR):
+    with open(os.path.join(table_path(name, directory), 'meta.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def has_table(name, directory=COLUMNAR_DIR):
+    return os.path.exists(os.path.join(table_path(name, directory), 'meta.json'))
+
+
+def read_table(name, columns=None, directory=COLUMNAR_DIR, data_dir=DATA_DIR):
+    """
+    Open a table with every column memory-mapped (only the requested ones
+    when columns is given). Falls back to ./data/<name>.pkl when the table has
+    not been converted yet.
+    """
+    # Resolve the published version once, an ingest may commit meanwhile
+    path = table_path(name, directory)
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        df = pd.read_pickle(os.path.join(data_dir, f'{name}.pkl'))
+        return df if columns is None else df[list(columns)]
+
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    wanted = meta['columns'] if columns is None else [c for c in meta['columns'] if c['name'] in set(columns)]
+    if columns is not None and len(wanted) != len(set(columns)):
+        missing = set(columns) - {c['name'] for c in wanted}
+        raise KeyError(f'{name} has no column(s) {sorted(missing)}')
+
+    data = {
+        c['name']: _decode_column(np.load(os.path.join(path, c['file']), mmap_mode='r', allow_pickle=False), c)
+        for c in wanted
+    }
+    df = pd.DataFrame(data, copy=False)
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+def convert_pickles(data_dir=DATA_DIR, directory=COLUMNAR_DIR, names=None):
+    """
+    One-shot conversion of every ./data/*.pkl (or just names) to columnar
+    tables. Returns {name: (pickle bytes, columnar bytes)}.
+    """
+    if names is None:
+        names = sorted(f[:-4] for f in os.listdir(data_dir) if f.endswith('.pkl'))
+
+    sizes = {}
+    for name in names:
+        source = os.path.join(data_dir, f'{name}.pkl')
+        df = pd.read_pickle(source).reset_index(drop=True)
+        target = write_table(df, name, directory)
+        sizes[name] = (
+            os.path.getsize(source),
+            sum(os.path.getsize(os.path.join(target, f)) for f in os.listdir(target)),
+        )
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('names', nargs='*', help='datasets to convert (default: every .pkl in ./data)')
+    args = parser.parse_args()
+
+    for name, (before, after) in convert_pickles(names=args.names or None).items():
+        print(f'{name}: {before / 1024:.0f} KiB pickle -> {after / 1024:.0f} KiB columnar')
+
+
+if __name__ == '__main__':
+    main()
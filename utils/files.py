@@ -0,0 +1,58 @@
+"""
+Writing files and directories so readers never see a partial one: everything
+is written next to the target first, then renamed over it (atomic on the same
+filesystem). Temporary names contain '.tmp-' and never end like the target.
+"""
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+
+def _tmp_path(path):
+    return f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+
+
+@contextmanager
+def atomic_open(path, mode='w'):
+    """with atomic_open(path) as f: ... path only changes once the block completes."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = _tmp_path(path)
+    try:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write(path, data):
+    """Replace path with data (str or bytes)."""
+    with atomic_open(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+
+
+@contextmanager
+def atomic_directory(target, replace=True):
+    """
+    with atomic_directory(target) as tmp: ... fill tmp, it replaces target
+    once the block completes (FileExistsError if target exists and not replace).
+    """
+    tmp = _tmp_path(target)
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        yield tmp
+        old = f'{target}.old-{os.getpid()}-{threading.get_ident()}'
+        if os.path.exists(target):
+            if not replace:
+                raise FileExistsError(target)
+            os.replace(target, old)
+        os.replace(tmp, target)
+        shutil.rmtree(old, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,217 @@
+"""
+Incremental refresh of the vote tables from append-only batches.
+
+A batch is a file of new vote records (one row per member per vote, the
+columns of VOTE_RESULTS_2, plus voter_id when it is known). Ingesting it:
+  - appends the rows to VOTE_RESULTS_2 without re-encoding the existing rows
+  - adds the batch's votes to the TOTAL / ABSENT counts of the members that
+    voted in it, and recomputes their absence ratio only
+  - keeps a copy of the batch under ./data/batches (the append-only log)
+  - publishes both tables under a new version stamp in one manifest rename
+    (utils/datastore.py), so the dashboard keeps serving the previous
+    version until the whole refresh is committed
+  - brings the per-bill vote index up to date with just the new rows
+
+Every table has its own version stamp: caches keyed on a table (see
+utils/loaders.py) are dropped only when that table changed, and bubble
+layouts are content-addressed so only changed ratios are re-packed.
+
+    python -m utils.ingest new_votes.csv [more_votes.pkl ...]
+Ingesting a batch a second time is a no-op.
+"""
+import argparse
+import fcntl
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from utils.datastore import append_table, has_table, read_meta, read_table, write_table
+from utils.manifest import COLUMNAR_DIR, DATA_DIR, read_manifest, write_manifest
+
+VOTES = 'VOTE_RESULTS_2'
+ABSENT = 'ABSENT_RATIO'
+BATCH_DIR = './data/batches'
+
+ABSENT_OPTION = 'ลา / ขาดลงมติ'
+REQUIRED_COLUMNS = ['vote_id', 'title', 'start_date', 'result', 'voter_name', 'voter_party', 'option']
+
+
+@contextmanager
+def _ingest_lock(directory):
+    # One ingest at a time, readers never wait on it
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.ingest.lock'), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_batch(path):
+    if path.endswith('.csv'):
+        batch = pd.read_csv(path)
+    elif path.endswith('.pkl'):
+        batch = pd.read_pickle(path)
+    else:
+        raise ValueError(f'{path}: batches are .csv or .pkl files')
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in batch.columns]
+    if missing:
+        raise ValueError(f'{path}: missing column(s) {missing}')
+    batch = batch.reset_index(drop=True)
+    batch['start_date'] = pd.to_datetime(batch['start_date'])
+    return batch
+
+
+def batch_hash(batch):
+    digest = hashlib.sha256('\x1f'.join(map(str, batch.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(batch.astype(object), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def update_absence(absent, batch):
+    """
+    absent (the ABSENT_RATIO table) with the votes of batch added. Only the
+    rows of members who voted in batch change, new members are added at the
+    end. Returns (table, labels of the touched members).
+    """
+    absent = absent.astype({c: object for c in absent.columns if isinstance(absent[c].dtype, pd.CategoricalDtype)})
+    # The published table is memory-mapped read-only, and astype() keeps columns that already have
+    # the right dtype (e.g. size) as they are: update a copy
+    absent = absent.astype({'TOTAL': np.int64, 'ABSENT': np.int64, 'size': np.float64}).reset_index(drop=True).copy()
+
+    # voter_id when both sides have it, the member's name otherwise
+    if 'voter_id' in batch.columns and 'voter_id' in absent.columns and batch['voter_id'].notna().all():
+        batch_key, table_key = batch['voter_id'].astype(str), 'voter_id'
+    else:
+        batch_key, table_key = batch['voter_name'], 'label'
+
+    votes = pd.DataFrame({'key': batch_key.to_numpy(), 'absent': (batch['option'] == ABSENT_OPTION).to_numpy(),
+                          'label': batch['voter_name'].to_numpy(), 'party': batch['voter_party'].to_numpy()})
+    counts = votes.groupby('key', sort=False).agg(TOTAL=('absent', 'size'), ABSENT=('absent', 'sum'),
+                                                  label=('label', 'last'), party=('party', 'last'))
+
+    rows = pd.Index(absent[table_key].astype(object)).get_indexer(counts.index)
+    known = rows >= 0
+    total, absent_ = absent.columns.get_loc('TOTAL'), absent.columns.get_loc('ABSENT')
+    absent.iloc[rows[known], total] += counts['TOTAL'].to_numpy()[known]
+    absent.iloc[rows[known], absent_] += counts['ABSENT'].to_numpy()[known]
+
+    new = counts[~known]
+    if len(new):
+        added = pd.DataFrame({
+            'voter_id': new.index if table_key == 'voter_id' else None,
+            'label': new['label'].to_numpy(),
+            'image_url': None,
+            'ASSUMED_PARTY': new['party'].to_numpy(),
+            'TOTAL': new['TOTAL'].to_numpy(),
+            'ABSENT': new['ABSENT'].to_numpy(),
+        })
+        absent = pd.concat([absent, added.reindex(columns=absent.columns)], ignore_index=True)
+
+    touched = np.concatenate([rows[known], np.arange(len(absent) - len(new), len(absent))])
+    size = absent.columns.get_loc('size')
+    absent.iloc[touched, size] = absent['ABSENT'].to_numpy()[touched] / absent['TOTAL'].to_numpy()[touched]
+
+    # Same order as the original table (most votes first)
+    absent = absent.sort_values('TOTAL', ascending=False, kind='stable', ignore_index=True)
+    return absent, list(counts['label'])
+
+
+def _prune(manifest, directory):
+    # Keep the published version of each table and the one before it, for
+    # sessions that are still reading it
+    keep = {entry['path'] for entry in manifest['tables'].values()}
+    keep |= {entry['previous'] for entry in manifest['tables'].values() if entry.get('previous')}
+    for name in manifest['tables']:
+        for entry in os.listdir(directory):
+            if entry.startswith(f'{name}@') and entry not in keep and '.tmp-' not in entry:
+                shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+def ingest(batches, name=VOTES, directory=COLUMNAR_DIR, data_dir=DATA_DIR, batch_dir=BATCH_DIR, update_index=True):
+    """
+    Apply batches (DataFrames of new vote records) and commit them as one new
+    version. Returns a summary of what changed.
+    """
+    with _ingest_lock(directory):
+        manifest = read_manifest(directory)
+        manifest.setdefault('batches', [])
+        seen = {b['hash'] for b in manifest['batches']}
+
+        fresh = []
+        for batch in batches:
+            digest = batch_hash(batch)
+            if digest not in seen:
+                seen.add(digest)
+                fresh.append((digest, batch))
+        if not fresh:
+            return dict(version=manifest['version'], rows=0, bills=0, members=0)
+
+        version = manifest['version'] + 1
+        combined = pd.concat([batch for _, batch in fresh], ignore_index=True)
+
+        # Votes: append to the published table (converted from the pickle the first time)
+        if has_table(name, directory):
+            columns = [c['name'] for c in read_meta(name, directory)['columns']]
+            append_table(combined.reindex(columns=columns), name, version, directory)
+        elif os.path.exists(os.path.join(data_dir, f'{name}.pkl')):
+            base = pd.read_pickle(os.path.join(data_dir, f'{name}.pkl'))
+            write_table(pd.concat([base, combined.reindex(columns=base.columns)], ignore_index=True),
+                        name, directory, version)
+        else:
+            write_table(combined, name, directory, version)
+
+        # Absence ratio: only the members in the batches
+        absent, members = update_absence(read_table(ABSENT, directory=directory, data_dir=data_dir), combined)
+        write_table(absent, ABSENT, directory, version)
+
+        # The append-only log of what went in
+        os.makedirs(batch_dir, exist_ok=True)
+        for digest, batch in fresh:
+            batch.to_pickle(os.path.join(batch_dir, f'{version:06d}-{digest[:12]}.pkl'))
+
+        bills = list(combined['title'].unique())
+        for table in (name, ABSENT):
+            entry = manifest['tables'].get(table)
+            manifest['tables'][table] = dict(path=f'{table}@{version}', version=version,
+                                             previous=entry['path'] if entry else None)
+        manifest['version'] = version
+        manifest['batches'].extend(dict(hash=digest, file=f'{version:06d}-{digest[:12]}.pkl', version=version,
+                                        rows=len(batch)) for digest, batch in fresh)
+        manifest.setdefault('changes', {})[str(version)] = dict(bills=bills, members=members)
+
+        # Commit: everything above is invisible to readers until this rename
+        write_manifest(manifest, directory)
+        _prune(manifest, directory)
+
+    if update_index:
+        from utils.vote_index import build_index
+
+        # The published table is the indexed one plus new rows, so only those are added
+        build_index(read_table(name, directory=directory), name)
+
+    return dict(version=version, rows=len(combined), bills=len(bills), members=len(members))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('batches', nargs='+', help='.csv or .pkl files of new vote records')
+    parser.add_argument('--name', default=VOTES)
+    args = parser.parse_args()
+
+    summary = ingest([read_batch(path) for path in args.batches], args.name)
+    if summary['rows'] == 0:
+        print(f'Nothing new, still at version {summary["version"]}')
+    else:
+        print(f'Version {summary["version"]}: {summary["rows"]} votes, '
+              f'{summary["bills"]} bills and {summary["members"]} members updated')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Background worker pool for the expensive parts of a page (figure builders,
+index builds), so the script thread can lay out the page and fill each
+st.empty() placeholder as its result arrives instead of building everything
+in order.
+
+Jobs are keyed. While a job is running, submitting the same key again
+returns the same Future, so sessions asking for the same figure at the same
+time wait on one computation. Finished jobs are forgotten, caching their
+results is up to the caller (e.g. the figure cache).
+
+Workers must not call Streamlit: they have no script run context. Hand the
+results back to the script thread, e.g. with as_ready(). Their trace spans
+go to the run that submitted the job (utils/tracing.py).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.tracing import attach, capture, span
+
+
+def _run(context, stage, fn, args, kwargs):
+    with attach(context), span(f'job {stage}'):
+        return fn(*args, **kwargs)
+
+
+class JobPool:
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._executor = None
+        self._running = {}
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.shared = 0
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        Future of fn(*args, **kwargs), shared with any running job of the same
+        key. key is a string or a tuple starting with one, its trace stage.
+        """
+        with self._lock:
+            future = self._running.get(key)
+            if future is not None:
+                self.shared += 1
+                return future
+            if self._executor is None:
+                # Started on first use, importing a page does not spawn threads
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='politigraph-job')
+            stage = key if isinstance(key, str) else key[0]
+            future = self._executor.submit(_run, capture(), stage, fn, args, kwargs)
+            self._running[key] = future
+            self.submitted += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._running.get(key) is future:
+                del self._running[key]
+
+    def stats(self):
+        with self._lock:
+            return dict(submitted=self.submitted, shared=self.shared, running=len(self._running),
+                        max_workers=self.max_workers)
+
+
+jobs = JobPool(max_workers=int(os.environ.get('POLITIGRAPH_WORKERS', 4)))
+
+
+def as_ready(pending):
+    """
+    pending is {future: item}. Yields (item, result) on the calling thread in
+    the order the jobs finish, e.g. to fill placeholders as results arrive.
+    A failed job raises here, on the script thread.
+    """
+    for future in as_completed(pending):
+        yield pending[future], future.result()
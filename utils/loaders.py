@@ -0,0 +1,208 @@
+"""
+Process-wide dataset cache shared by every Streamlit session.
+
+Streamlit re-runs a page script on every widget interaction and runs each
+session on its own thread of the same process. Loading through this module
+means each dataset, and everything derived from it (e.g. the bill title
+list), is built once per process and then handed to every session. The
+objects are shared: treat them as read-only and copy before mutating.
+
+Entries are keyed on the backing file's signature (size, mtime, inode) so a
+refreshed file under ./data is picked up on the next access. Tables published
+by utils/ingest.py live in a directory per version, so only the tables (and
+derived values) an ingest actually touched are reloaded.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.manifest import DATA_DIR, table_path
+from utils.tracing import span
+
+
+def _source_file(name):
+    # The columnar table wins over the pickle, like read_table()
+    meta = os.path.join(table_path(name), 'meta.json')
+    return meta if os.path.exists(meta) else os.path.join(DATA_DIR, f'{name}.pkl')
+
+
+def _read_table(name):
+    # pandas is only imported once a dataset is actually loaded, a page served
+    # from the figure cache never needs it
+    from utils.datastore import read_table
+
+    return read_table(name)
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return (path, st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def _nbytes(value):
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple, dict, set)):
+        return sum(len(str(v).encode('utf-8')) for v in value)
+    return 0
+
+
+class KeyLocks:
+    """
+    with locks(key): ... one lock per key, dropped again once nobody holds or
+    waits on it (keys like a date window are unbounded).
+    """
+
+    def __init__(self):
+        self._locks = {}  # key -> [lock, holders and waiters]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def __call__(self, key):
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def __len__(self):
+        return len(self._locks)
+
+
+class DatasetCache:
+
+    def __init__(self, loader=_read_table, signature=lambda name: file_signature(_source_file(name))):
+        self.loader = loader
+        self.signature = signature
+        self._entries = {}
+        self._key_lock = KeyLocks()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _get(self, key, signature, build):
+        entry = self._entries.get(key)
+        if entry is not None and entry['signature'] == signature:
+            self.hits += 1
+            return entry['value']
+
+        # One session builds, concurrent sessions wait for it instead of
+        # loading the same file again
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry['signature'] == signature:
+                self.hits += 1
+                return entry['value']
+
+            self.misses += 1
+            if entry is not None:
+                self.invalidations += 1
+            start = time.perf_counter()
+            value = build()
+            self._entries[key] = dict(signature=signature, value=value,
+                                      load_seconds=time.perf_counter() - start, nbytes=_nbytes(value))
+            return value
+
+    def load(self, name):
+        """The dataset called name (./data/<name>.pkl or its columnar table)."""
+        with span(f'load {name}'):
+            return self._get((name, None), self.signature(name), lambda: self.loader(name))
+
+    def derived(self, name, key, build):
+        """
+        build(dataset) computed once per version of the dataset, e.g. the
+        list of bill titles. Dropped automatically when the file changes.
+        """
+        with span(f'derive {name}:{key}'):
+            signature = self.signature(name)
+            return self._get((name, key), signature, lambda: build(self.load(name)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        entries = {
+            f'{name}:{key}' if key else name: dict(nbytes=e['nbytes'], load_seconds=round(e['load_seconds'], 4))
+            for (name, key), e in list(self._entries.items())
+        }
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            invalidations=self.invalidations,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+            nbytes=sum(e['nbytes'] for e in entries.values()),
+            entries=entries,
+        )
+
+
+datasets = DatasetCache()
+
+
+def load_dataset(name):
+    return datasets.load(name)
+
+
+def has_dataset(name):
+    """Whether name exists at all (columnar table or pickle), e.g. before the first ingest."""
+    return os.path.exists(_source_file(name))
+
+
+def bill_titles(name='VOTE_RESULTS_2'):
+    """Unique bill titles in first-seen order, for the detail page selector."""
+    return datasets.derived(name, 'bill_titles', lambda df: list(df['title'].unique()))
+
+
+def vote_index(name='VOTE_RESULTS_2'):
+    """Per-bill aggregate index (utils/vote_index.py), updated when the table grows."""
+    from utils.vote_index import build_index
+
+    return datasets.derived(name, 'vote_index', lambda df: build_index(df, name))
+
+
+def bill_search_index(name='VOTE_RESULTS_2'):
+    """Thai-aware search index over the bill titles (utils/bill_search.py)."""
+    from utils.bill_search import BillSearchIndex
+
+    return datasets.derived(name, 'bill_search', lambda df: BillSearchIndex(bill_titles(name)))
+
+
+def absence_index(name='VOTE_RESULTS_2'):
+    """Member x sitting-day absence counts for any date window (utils/absence.py)."""
+    from utils.absence import AbsenceIndex
+
+    return datasets.derived(name, 'absence_index', AbsenceIndex)
+
+
+_row_counts = {}  # meta.json signature -> rows
+
+
+def has_vote_records(name='VOTE_RESULTS_2'):
+    """
+    Whether there are vote records yet, from the files alone so a page can
+    lay out without loading the table: the columnar table's row count, a
+    pickle counts as non-empty.
+    """
+    path = _source_file(name)
+    if not os.path.exists(path):
+        return False
+    if not path.endswith('meta.json'):
+        return True
+    signature = file_signature(path)
+    if signature not in _row_counts:
+        with open(path, encoding='utf-8') as f:
+            _row_counts[signature] = json.load(f)['rows']
+    return _row_counts[signature] > 0
@@ -0,0 +1,43 @@
+"""
+Published versions of the columnar tables (see utils/datastore.py).
+
+manifest.json in ./data/columnar maps each table refreshed by utils/ingest.py
+to its current <name>@<version> directory. Kept apart from the datastore so
+resolving a table's version (e.g. for a cache key) does not import pandas.
+"""
+import json
+import os
+
+from utils.files import atomic_open
+
+DATA_DIR = './data'
+COLUMNAR_DIR = './data/columnar'
+MANIFEST = 'manifest.json'
+
+
+def read_manifest(directory=COLUMNAR_DIR):
+    """Published versions of the ingested tables, see utils/ingest.py."""
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict(version=0, tables={}, batches=[])
+
+
+def write_manifest(manifest, directory=COLUMNAR_DIR):
+    """Publish manifest. This single rename is the commit point of an ingest."""
+    with atomic_open(os.path.join(directory, MANIFEST)) as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+
+def table_version(name, directory=COLUMNAR_DIR):
+    """Version stamp of the published table (0 if it was never ingested into)."""
+    entry = read_manifest(directory)['tables'].get(name)
+    return entry['version'] if entry else 0
+
+
+def table_path(name, directory=COLUMNAR_DIR, version=None):
+    if version is not None:
+        return os.path.join(directory, f'{name}@{version}')
+    entry = read_manifest(directory)['tables'].get(name)
+    return os.path.join(directory, entry['path'] if entry else name)
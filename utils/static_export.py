@@ -0,0 +1,324 @@
+"""
+Static export of the overview and of every bill's detail view, for a CDN or
+a plain file server to answer the common paths without a Streamlit run.
+
+The same builders as the pages are used (timeline, calendar and bubble chart
+through the figure cache, overview_vote_ratio, party_vote_breakdown, the
+metric-card HTML), without a Streamlit runtime:
+    python -m utils.static_export --out ./data/export
+    python -m utils.static_export --out ./data/export --workers 4 --force
+
+Output:
+    index.html              the overview (default date range) and the list of bills
+    overview.json           its figures (Plotly JSON) and absence numbers
+    bills/<slug>.html       one page per bill
+    bills/<slug>.json       its tallies and figures
+    manifest.json           a hash of every artifact's inputs
+
+Exports are incremental: an artifact is only rendered again when the hash of
+its inputs changed (e.g. an ingest added votes to that bill, or the renderer
+version below changed). Bills are rendered in parallel on a process pool.
+"""
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import plotly
+import plotly.io as pio
+
+from utils.files import atomic_write
+
+# Bump when the HTML or JSON layout changes, everything is exported again
+EXPORT_VERSION = 1
+EXPORT_DIR = './data/export'
+
+_PAGE = """<!DOCTYPE html>
+<html lang="th">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<script src="https://cdn.plot.ly/plotly-{plotly_js}.min.js" charset="utf-8"></script>
+<style>{css}
+body {{ font-family: sans-serif; max-width: 1200px; margin: 0 auto; padding: 1rem 2rem; }}
+.cards {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(160px, 1fr)); gap: 0.5rem; }}
+.columns {{ display: grid; grid-template-columns: 1fr 2fr 1fr; gap: 1rem; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else json.dumps(part, ensure_ascii=False, default=str).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def bill_slug(title):
+    """File name of a bill: stable across ingests, unlike its position in the index."""
+    return hashlib.sha1(title.encode('utf-8')).hexdigest()[:16]
+
+
+def _figure_div(fig, div_id):
+    return pio.to_html(fig, full_html=False, include_plotlyjs=False, div_id=div_id, config={'responsive': True})
+
+
+def _page(title, body):
+    from utils.assets import read_asset
+
+    return _PAGE.format(title=html.escape(title), plotly_js=plotly.offline.get_plotlyjs_version(),
+                        css=read_asset('style.css'), body=body)
+
+
+# Bills ######################################################################################################
+
+def bill_hash(bill_index, bill_id):
+    """Hash of everything a bill's page shows."""
+    counts = bill_index.party_option_counts[bill_id]
+    voted = np.flatnonzero(counts.sum(axis=1))
+    return _digest(EXPORT_VERSION, bill_index.titles[bill_id], bill_index.result(bill_id),
+                   bill_index.start_date(bill_id), bill_index.options, [bill_index.parties[p] for p in voted],
+                   np.ascontiguousarray(bill_index.option_counts[bill_id]).tobytes(),
+                   np.ascontiguousarray(counts[voted]).tobytes())
+
+
+def render_bill(bill_index, bill_id):
+    """(html, json) of one bill's detail view."""
+    from utils.bill_detail import metric_cards, status_badge, vote_colors, vote_tally
+    from utils.thai_dates import thai_strftime_array
+    from visualizations.overview_vote_ratio import overview_vote_ratio
+    from visualizations.party_vote_breakdown import party_vote_breakdown
+    from visualizations.vote_metric_cards import metric_card_html
+
+    title = bill_index.titles[bill_id]
+    result = bill_index.result(bill_id)
+    status = status_badge(result)
+    date = bill_index.start_date(bill_id)
+    date_th = thai_strftime_array([date], fmt='%d %B %Y')[0]
+
+    color_df = vote_colors()
+    pivoted_df = vote_tally(bill_index, bill_id, color_df)
+    party_df = bill_index.party_tally(bill_id, color_df['option'])
+    figures = dict(
+        overview_vote_ratio=overview_vote_ratio(pivoted_df),
+        party_counts=party_vote_breakdown(party_df, color_df),
+        party_shares=party_vote_breakdown(party_df, color_df, normalize=True),
+    )
+
+    cards = ''.join(metric_card_html(**card) for card in metric_cards(pivoted_df))
+    body = f"""<p><a href="../index.html">ภาพรวม</a></p>
+<h1>{html.escape(title)}</h1>
+<p><span style="color: {status['color']}; font-weight: 600;">{html.escape(status['text'])}</span></p>
+<p><b>วันที่:</b> {date_th or '-'}</p>
+<p><b>คำอธิบาย:</b> <i>ไม่มีคำอธิบาย</i></p>
+<div class="cards">{cards}</div>
+{_figure_div(figures['overview_vote_ratio'], 'overview_vote_ratio')}
+<h2>👥 ผลการลงมติรายสังกัด</h2>
+<h3>แสดงผลตามจำนวนสมาชิก</h3>
+{_figure_div(figures['party_counts'], 'party_counts')}
+<h3>แสดงผลตามสัดส่วน</h3>
+{_figure_div(figures['party_shares'], 'party_shares')}"""
+
+    data = dict(
+        title=title,
+        result=result,
+        status=status['text'],
+        date=None if date is None or date != date else date.date().isoformat(),
+        date_th=date_th,
+        tally={option: int(count) for option, count in zip(pivoted_df['option'], pivoted_df['count'])},
+        party_tally={party: {option: int(count) for option, count in row.items()} for party, row in party_df.iterrows()},
+        figures={name: json.loads(pio.to_json(fig, validate=False)) for name, fig in figures.items()},
+    )
+    return _page(title, body), json.dumps(data, ensure_ascii=False)
+
+
+def _export_bills(out, bill_ids):
+    # Runs in a worker: the index is loaded (or inherited) once per process
+    from utils.loaders import vote_index
+
+    bill_index = vote_index()
+    for bill_id in bill_ids:
+        page, data = render_bill(bill_index, bill_id)
+        slug = bill_slug(bill_index.titles[bill_id])
+        atomic_write(os.path.join(out, 'bills', f'{slug}.html'), page)
+        atomic_write(os.path.join(out, 'bills', f'{slug}.json'), data)
+    return len(bill_ids)
+
+
+# Overview ###################################################################################################
+
+OVERVIEW_FIGURES = ['timeline', 'calendar', 'absent_graph']
+NO_VOTES = '<p>ยังไม่มีข้อมูลการลงมติ</p>'
+
+
+def _bill_index():
+    # None before the first ingest (no vote records), the overview is still exported
+    from utils.loaders import has_vote_records, vote_index
+
+    return vote_index() if has_vote_records() else None
+
+
+def overview_hash(bill_index):
+    from utils.loaders import datasets, has_dataset
+    from visualizations.figure_cache import figure_key
+
+    votes = datasets.signature('VOTE_RESULTS_2') if has_dataset('VOTE_RESULTS_2') else None
+    return _digest(EXPORT_VERSION, [figure_key(name) for name in OVERVIEW_FIGURES], votes,
+                   bill_index.titles if bill_index is not None else [])
+
+
+def render_overview(bill_index):
+    """
+    (html, json) of the overview at its default (full) date range. Without
+    vote records (bill_index None) only the timeline and the all-time
+    bubble chart are drawn, like the page.
+    """
+    from utils.loaders import absence_index
+    from visualizations.figure_cache import figure_cache, figure_from_json
+    from visualizations.party_absence import party_absence_chart
+    from visualizations.vote_metric_cards import metric_card_html
+
+    names = [name for name in OVERVIEW_FIGURES if bill_index is not None or name != 'calendar']
+    texts = {name: figure_cache.get_or_build(name) for name in names}
+    figures = {name: figure_from_json(name, text) for name, text in texts.items()}
+    divs = {name: _figure_div(fig, name) for name, fig in figures.items()}
+
+    if bill_index is None:
+        absence, titles = None, []
+        cards = divs['calendar'] = divs['party_absence'] = NO_VOTES
+    else:
+        absences = absence_index()
+        overall, chambers, parties = absences.overall(), absences.by_chamber(), absences.by_party()
+        figures['party_absence'] = party_absence_chart(parties)
+        divs['party_absence'] = _figure_div(figures['party_absence'], 'party_absence')
+        absence = dict(overall=overall, chambers=chambers.to_dict('records'), parties=parties.to_dict('records'))
+        titles = bill_index.titles
+
+        cards = [metric_card_html('ทั้งหมด', f'{overall["size"]:.2%}',
+                                  f'ลา / ขาดลงมติ {overall["ABSENT"]:,d} จาก {overall["TOTAL"]:,d} ครั้ง ใน {overall["days"]:,d} วันประชุม',
+                                  border_left_color='#000000')]
+        cards += [metric_card_html(row['chamber'], f'{row["size"]:.2%}',
+                                   f'ลา / ขาดลงมติ {row["ABSENT"]:,d} จาก {row["TOTAL"]:,d} ครั้ง ({row["members"]:,d} คน)',
+                                   border_left_color='#d62728')
+                  for _, row in chambers.iterrows()]
+        cards = ''.join(cards)
+
+    bills = ''.join(f'<li><a href="bills/{bill_slug(title)}.html">{html.escape(title)}</a></li>'
+                    for title in titles)
+    body = f"""<h1>ภาพรวมการทำงานของสมาชิกสภาผู้แทนราษฎรและสมาชิกวุฒิสภา</h1>
+<p>เนื่องจากเงินเดือนของสมาชิกสภาผู้แทนราษฎร (สส.) และสมาชิกวุฒิสภา (สว.) รวมไปถึงค่าใช้จ่ายต่าง ๆ ในการจัดประชุมสภา ล้วนมาจากภาษีของประชาชน</p>
+<h2>วาระของสภาผู้แทนราษฎรและวุฒิสภา</h2>
+{divs['timeline']}
+{divs['calendar']}
+<h2>อัตราการลาหรือขาดประชุมของสมาชิก</h2>
+<div class="columns">
+<div><h4>ภาพรวม</h4>{cards}</div>
+<div><h4>รายสมาชิก</h4>{divs['absent_graph']}</div>
+<div><h4>รายสังกัด</h4>{divs['party_absence']}</div>
+</div>
+<h2>ร่างกฎหมาย</h2>
+<ul>{bills}</ul>"""
+
+    data = dict(
+        absence=absence,
+        bills={bill_slug(title): title for title in titles},
+        figures={name: json.loads(text) for name, text in texts.items()},
+    )
+    if 'party_absence' in figures:
+        data['figures']['party_absence'] = json.loads(pio.to_json(figures['party_absence'], validate=False))
+    return _page('ภาพรวม', body), json.dumps(data, ensure_ascii=False, default=float)
+
+
+def _export_overview(out):
+    page, data = render_overview(_bill_index())
+    atomic_write(os.path.join(out, 'index.html'), page)
+    atomic_write(os.path.join(out, 'overview.json'), data)
+    return 1
+
+
+# Export #####################################################################################################
+
+def _read_manifest(out):
+    try:
+        with open(os.path.join(out, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict(overview=None, bills={})
+
+
+def export(out=EXPORT_DIR, workers=None, force=False, chunk_size=64):
+    """
+    Render whatever changed since the last export into out. Returns counts of
+    the exported, unchanged and removed artifacts.
+    """
+    bill_index = _bill_index()
+    manifest = _read_manifest(out)
+    if manifest.get('version') != EXPORT_VERSION:
+        force = True
+
+    def current(paths, old_hash, new_hash):
+        return not force and old_hash == new_hash and all(os.path.exists(os.path.join(out, path)) for path in paths)
+
+    titles = bill_index.titles if bill_index is not None else []
+    bills = {bill_slug(title): (bill_id, bill_hash(bill_index, bill_id)) for bill_id, title in enumerate(titles)}
+    changed = [bill_id for slug, (bill_id, digest) in bills.items()
+               if not current([os.path.join('bills', f'{slug}.{extension}') for extension in ('html', 'json')],
+                              manifest['bills'].get(slug), digest)]
+    new_overview = overview_hash(bill_index)
+    overview_changed = not current(['index.html', 'overview.json'], manifest.get('overview'), new_overview)
+
+    # Forking is fine from the CLI (no server threads), workers inherit the loaded index
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+    with ProcessPoolExecutor(workers or os.cpu_count(), mp_context=context) as pool:
+        futures = [pool.submit(_export_overview, out)] if overview_changed else []
+        futures += [pool.submit(_export_bills, out, changed[i:i + chunk_size]) for i in range(0, len(changed), chunk_size)]
+        for future in futures:
+            future.result()
+
+    # Bills no longer in the data
+    removed = [slug for slug in manifest['bills'] if slug not in bills]
+    for slug in removed:
+        for extension in ('html', 'json'):
+            try:
+                os.remove(os.path.join(out, 'bills', f'{slug}.{extension}'))
+            except FileNotFoundError:
+                pass
+
+    atomic_write(os.path.join(out, 'manifest.json'), json.dumps(dict(
+        version=EXPORT_VERSION,
+        overview=new_overview,
+        bills={slug: digest for slug, (_, digest) in bills.items()},
+    )))
+    return dict(overview=int(overview_changed), bills=len(changed), unchanged=len(bills) - len(changed),
+                removed=len(removed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default=EXPORT_DIR)
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='export everything, not only what changed')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = export(args.out, workers=args.workers, force=args.force)
+    print(f"Exported the overview {'(changed)' if result['overview'] else '(unchanged)'} and {result['bills']} bills "
+          f"({result['unchanged']} unchanged, {result['removed']} removed) to {args.out} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
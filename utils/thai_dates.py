@@ -0,0 +1,160 @@
+"""
+Thai (Buddhist era) date labels for whole columns at once, with the same
+output as pythainlp's thai_strftime.
+
+Most directives only depend on one part of the date: %b on the month, %-d on
+the day of the month, %Y on the year and so on. For those, each distinct
+part value is formatted once, by thai_strftime itself on a date with that
+value, into a small lookup table (12 months, 31 days, 7 weekdays, the years
+seen). A column is then formatted per distinct day with array lookups and
+concatenation, and mapped back to its rows.
+
+Formats with directives that need the whole date or time (%c, %H, %D, ...)
+call thai_strftime once per distinct value instead, still not once per row.
+Formatters are cached per format string:
+    thai_strftime_array(df['start_date'], '%-d %b %Y')
+"""
+import functools
+import threading
+from datetime import datetime, timedelta
+from string import digits
+
+import numpy as np
+import pandas as pd
+from pythainlp import thai_digits
+from pythainlp.util import thai_strftime
+
+# What thai_strftime(..., thaidigit=True) applies to its whole output
+_THAI_DIGITS = str.maketrans(digits, thai_digits)
+
+# thai_strftime's extension flags (%-d, %_d, %0d, %^b, %#b, %Eb, %Od)
+_FLAGS = 'EO-_0^#'
+
+# Directive -> the part of the date it depends on, and a date with a given value of that part
+_PARTS = dict(
+    day=('de', lambda value: datetime(2000, 1, int(value))),
+    month=('bBhm', lambda value: datetime(2000, int(value), 1)),
+    weekday=('aAuw', lambda value: datetime(2024, 1, 1) + timedelta(days=int(value))),  # 2024-01-01 is a Monday
+    doy=('j', lambda value: datetime(2000, 1, 1) + timedelta(days=int(value) - 1)),  # a leap year
+    year=('YyC', lambda value: datetime(int(value), 1, 1)),
+    constant=('%', lambda value: datetime(2000, 1, 1)),
+)
+_PART_OF = {char: part for part, (chars, _) in _PARTS.items() for char in chars}
+
+# Only depend on the date, not the time of day
+_DATE_ONLY = set(_PART_OF) | set('DFxvGgUWV')
+
+
+def _tokens(fmt):
+    """
+    Split fmt like thai_strftime does: literal text, and (flag, directive)
+    pairs. A lone trailing '%' or flag stays literal.
+    """
+    tokens, i = [], 0
+    while i < len(fmt):
+        if fmt[i] != '%':
+            tokens.append(fmt[i])
+            i += 1
+        elif i + 1 >= len(fmt):
+            tokens.append('%')
+            i += 1
+        elif fmt[i + 1] not in _FLAGS:
+            tokens.append(('', fmt[i + 1]))
+            i += 2
+        elif i + 2 >= len(fmt):
+            tokens.append(fmt[i + 1])
+            i += 2
+        else:
+            tokens.append((fmt[i + 1], fmt[i + 2]))
+            i += 3
+    return tokens
+
+
+def _parts(days):
+    """day, month, weekday, doy and year of datetime64[D] values."""
+    index = pd.DatetimeIndex(days)
+    return dict(day=index.day.to_numpy(), month=index.month.to_numpy(), weekday=index.dayofweek.to_numpy(),
+                doy=index.dayofyear.to_numpy(), year=index.year.to_numpy(), constant=np.zeros(len(days), dtype=int))
+
+
+class ThaiDateFormat:
+
+    def __init__(self, fmt, thaidigit=False):
+        self.fmt = fmt
+        self.thaidigit = thaidigit
+        self.tokens = _tokens(fmt)
+        directives = [token[1] for token in self.tokens if isinstance(token, tuple)]
+        self.by_part = all(char in _PART_OF for char in directives)
+        self.date_only = all(char in _DATE_ONLY for char in directives)
+        self._tables = {}
+        self._formatted = {}  # formats that need the whole value: value -> text
+        self._lock = threading.Lock()  # shared by every session (and background job)
+
+    def _lookup(self, flag, char, values):
+        """Text of one directive for each of values (its date part), tables filled on first use."""
+        part = _PART_OF[char]
+        with self._lock:
+            table = self._tables.setdefault((flag, char), {})
+            for value in np.unique(values):
+                if value not in table:
+                    table[value] = thai_strftime(_PARTS[part][1](value), f'%{flag}{char}')
+            keys = np.fromiter(table, dtype=np.int64, count=len(table))
+            texts = np.array(list(table.values()), dtype=object)
+        order = np.argsort(keys)
+        return texts[order][np.searchsorted(keys[order], values)]
+
+    def _compose(self, days):
+        parts = _parts(days)
+        out = np.full(len(days), '', dtype=object)
+        literal = ''
+        for token in self.tokens:
+            if not isinstance(token, tuple):
+                literal += token
+                continue
+            if literal:
+                out += literal
+                literal = ''
+            flag, char = token
+            out += self._lookup(flag, char, parts[_PART_OF[char]])
+        if literal:
+            out += literal
+        if self.thaidigit:
+            out = np.array([text.translate(_THAI_DIGITS) for text in out], dtype=object)
+        return out
+
+    def _one_by_one(self, values):
+        with self._lock:
+            formatted = self._formatted
+            for value in values:
+                if value not in formatted:
+                    formatted[value] = thai_strftime(pd.Timestamp(value).to_pydatetime(), self.fmt, self.thaidigit)
+            return np.array([formatted[value] for value in values], dtype=object)
+
+    def format(self, dates):
+        """
+        Thai text of every date in dates (anything pd.to_datetime takes), as
+        an object array. Missing dates give None.
+        """
+        values = pd.DatetimeIndex(pd.to_datetime(pd.Series(dates).to_numpy()))
+        missing = values.isna()
+        values = values[~missing].to_numpy()
+        if self.date_only:
+            values = values.astype('datetime64[D]')
+
+        unique, inverse = np.unique(values, return_inverse=True)
+        texts = self._compose(unique) if self.by_part else self._one_by_one(unique)
+
+        out = np.full(len(missing), None, dtype=object)
+        out[~missing] = texts[inverse]
+        return out
+
+
+@functools.lru_cache(maxsize=64)
+def thai_date_format(fmt='%-d %b %y', thaidigit=False):
+    """The formatter for fmt, one per format string and process."""
+    return ThaiDateFormat(fmt, thaidigit)
+
+
+def thai_strftime_array(dates, fmt='%-d %b %y', thaidigit=False):
+    """thai_strftime over a whole column: object array of strings, None for missing dates."""
+    return thai_date_format(fmt, thaidigit).format(dates)
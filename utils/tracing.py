@@ -0,0 +1,277 @@
+"""
+Lightweight tracing of where a page run spends its time.
+
+Wrap a stage with the @traced decorator or the span() context manager. Each
+stage records its wall time, the CPU time of the session's thread, memory
+allocated while it ran (net and peak, from tracemalloc) and, for stages
+returning a figure, the figure's serialized size.
+
+Tracing is off by default and then costs one thread-local lookup per stage.
+It is turned on for one page run with ?debug=1 in the URL (which also shows
+the hidden debug panel at the bottom of the page), or for every run with
+POLITIGRAPH_TRACE=1. Records are appended to ./data/cache/trace.jsonl.
+
+Memory tracing (tracemalloc) slows every allocation in the process, so a
+?debug=1 run only keeps it on until its debug panel is drawn: it is stopped
+once no debug run is in progress. POLITIGRAPH_TRACE=1 keeps it on for good.
+
+Work handed to another thread (utils/jobs.py) keeps recording into the run
+that submitted it: capture() the context on the script thread and re-enter
+it with attach() on the worker.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+TRACE_LOG = os.environ.get('POLITIGRAPH_TRACE_LOG', './data/cache/trace.jsonl')
+ALWAYS_ON = os.environ.get('POLITIGRAPH_TRACE') == '1'
+
+# Streamlit runs each session's script on its own thread
+_state = threading.local()
+_log_lock = threading.Lock()
+
+# Debug runs in progress that need tracemalloc, across sessions
+_tracing_runs = set()
+_tracing_lock = threading.Lock()
+_started_tracing = False
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+        return ctx.session_id if ctx is not None else None
+    except ImportError:
+        return None
+
+
+def _hold_tracing(run):
+    global _started_tracing
+    with _tracing_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_runs.add(run)
+
+
+def _release_tracing(run):
+    global _started_tracing
+    with _tracing_lock:
+        if run not in _tracing_runs:
+            return
+        _tracing_runs.discard(run)
+        # Only stop what a debug run started (not POLITIGRAPH_TRACE=1 or PYTHONTRACEMALLOC)
+        if not _tracing_runs and _started_tracing and not ALWAYS_ON:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def start_run(page):
+    """
+    Call at the top of a page script. Turns tracing on for this run when
+    ?debug=1 is in the URL (or POLITIGRAPH_TRACE=1), returns whether it is on.
+    """
+    enabled = ALWAYS_ON
+    if not enabled:
+        import streamlit as st
+
+        enabled = st.query_params.get('debug') == '1'
+
+    # A previous debug run of this session that stopped before end_run() (e.g. a rerun)
+    _release_tracing(getattr(_state, 'run', None))
+
+    _state.active = enabled
+    _state.page = page
+    _state.run = uuid.uuid4().hex[:8]
+    _state.records = []
+    _state.stack = []
+    _state.t0 = time.perf_counter()
+    if enabled:
+        _hold_tracing(_state.run)
+    return enabled
+
+
+def end_run():
+    """Call once the page run is done (debug_panel() does), stops tracemalloc if nothing else traces."""
+    _release_tracing(getattr(_state, 'run', None))
+
+
+def capture():
+    """Trace context of this thread's run, for attach() on another thread."""
+    return dict(
+        active=getattr(_state, 'active', ALWAYS_ON),
+        page=getattr(_state, 'page', None),
+        run=getattr(_state, 'run', None),
+        records=getattr(_state, 'records', None),
+        t0=getattr(_state, 't0', None),
+        session=_session_id(),
+    )
+
+
+@contextmanager
+def attach(context):
+    """
+    Record this thread's spans into the run context was captured from, and
+    leave the thread's own state as it was afterwards (pool threads outlive
+    runs).
+    """
+    saved = dict(vars(_state))
+    vars(_state).clear()
+    if context['active']:
+        vars(_state).update(context, stack=[], job=True)
+        if context['records'] is None:
+            _state.records, _state.t0 = [], time.perf_counter()
+    else:
+        _state.active = False
+    try:
+        yield
+    finally:
+        vars(_state).clear()
+        vars(_state).update(saved)
+
+
+def active():
+    return getattr(_state, 'active', ALWAYS_ON)
+
+
+def _serialized_size(value):
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if hasattr(value, 'to_plotly_json'):
+        import plotly.io as pio
+
+        return len(pio.to_json(value, validate=False))
+    return None
+
+
+def _write(record):
+    try:
+        os.makedirs(os.path.dirname(TRACE_LOG), exist_ok=True)
+        with _log_lock, open(TRACE_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError:
+        pass  # tracing never breaks a page
+
+
+class span:
+    """
+    with span('stage') as s: ... records the stage (set s.result to a figure
+    to also record its serialized size). A no-op when tracing is off.
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.result = None
+
+    def __enter__(self):
+        self.on = active()
+        if self.on:
+            if not hasattr(_state, 'records'):
+                _state.records, _state.stack, _state.t0 = [], [], time.perf_counter()
+            self.parent = _state.stack[-1] if _state.stack else None
+            _state.stack.append(self)
+            self.peak_seen = 0
+            self.memory = None
+            if tracemalloc.is_tracing():
+                # The peak counter is reset per stage, hand the enclosing stage its peak so far first
+                self.memory, peak = tracemalloc.get_traced_memory()
+                if self.parent is not None and self.parent.memory is not None:
+                    self.parent.peak_seen = max(self.parent.peak_seen, peak)
+                tracemalloc.reset_peak()
+            self.cpu = time.thread_time()
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if not self.on:
+            return False
+        wall = time.perf_counter() - self.start
+        cpu = time.thread_time() - self.cpu
+        _state.stack.pop()
+
+        record = dict(
+            ts=round(time.time(), 3),
+            session=getattr(_state, 'session', None) or _session_id(),
+            job=getattr(_state, 'job', False),
+            page=getattr(_state, 'page', None),
+            run=getattr(_state, 'run', None),
+            stage=self.stage,
+            depth=len(_state.stack),
+            start_ms=round((self.start - _state.t0) * 1000, 2),
+            wall_ms=round(wall * 1000, 2),
+            cpu_ms=round(cpu * 1000, 2),
+            alloc_kib=None,
+            peak_kib=None,
+            bytes=None,
+            error=exc[0].__name__ if exc[0] is not None else None,
+        )
+        if self.memory is not None:
+            # Process-wide counters: approximate when sessions render concurrently
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self.peak_seen)
+            record.update(alloc_kib=round((current - self.memory) / 1024, 1),
+                          peak_kib=round(max(peak - self.memory, 0) / 1024, 1))
+        if self.result is not None:
+            record['bytes'] = _serialized_size(self.result)
+
+        _state.records.append(record)
+        _write(record)
+        return False
+
+
+def traced(stage=None):
+    """
+    Decorator version of span(). The stage name defaults to module.function:
+        @traced
+        def timeline_gantt_chart(): ...
+    """
+    def decorate(func):
+        name = stage or f'{func.__module__.rsplit(".", 1)[-1]}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not getattr(_state, 'active', ALWAYS_ON):
+                return func(*args, **kwargs)
+            with span(name) as s:
+                s.result = func(*args, **kwargs)
+                return s.result
+        return wrapper
+
+    if callable(stage):
+        func, stage = stage, None
+        return decorate(func)
+    return decorate
+
+
+def records():
+    """Stages recorded so far in this session's current run."""
+    return list(getattr(_state, 'records', []))
+
+
+def debug_panel():
+    """The hidden debug panel, shown at the bottom of a page run with ?debug=1."""
+    end_run()
+    if not active():
+        return
+    import pandas as pd
+    import streamlit as st
+
+    df = pd.DataFrame(records())
+    with st.expander(':material/bug_report: Render trace', expanded=True):
+        if df.empty:
+            st.caption('No stages recorded')
+            return
+        df = df.sort_values('start_ms', kind='stable', ignore_index=True)  # recorded on exit
+        df['stage'] = [' ' * depth + stage for depth, stage in zip(df['depth'], df['stage'])]
+        # Jobs run next to the script thread, their time overlaps it
+        top = (df['depth'] == 0) & ~df['job']
+        st.caption(f'{top.sum()} top-level stages, {df.loc[top, "wall_ms"].sum():.0f} ms wall, '
+                   f'{df.loc[top, "cpu_ms"].sum():.0f} ms CPU. Log: {TRACE_LOG}')
+        st.dataframe(df[['stage', 'wall_ms', 'cpu_ms', 'alloc_kib', 'peak_kib', 'bytes', 'error']],
+                     hide_index=True)
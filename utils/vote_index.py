@@ -0,0 +1,228 @@
+"""
+Per-bill aggregate index over the raw vote table (VOTE_RESULTS_2).
+
+For every bill it holds the tally by option, the tally by voter_party and
+option, the bill's result and start_date, and where its rows sit in the raw
+table, so the detail page answers a bill selection with array lookups
+instead of scanning and grouping the whole table.
+
+Build or update it offline with:
+    python -m utils.vote_index
+Appending votes to the table and re-running only adds the new rows to the
+tallies of the bills they belong to. A hash of every indexed row is kept, so
+a regenerated or reordered table is rebuilt from scratch instead.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.datastore import read_table
+from utils.files import atomic_directory
+
+INDEX_DIR = './data/index'
+
+_ARRAYS = ['option_counts', 'party_option_counts', 'start_dates', 'row_bill', 'row_hashes']
+
+# What the index is built from, a change in any of them invalidates it
+_HASHED_COLUMNS = ['vote_id', 'title', 'start_date', 'result', 'voter_party', 'option']
+
+
+def row_hashes(df):
+    """
+    uint64 hash of every row of df over _HASHED_COLUMNS, the same for the
+    pickle and the columnar table (categories, narrowed ints, date units).
+    """
+    columns = {}
+    for name in _HASHED_COLUMNS:
+        values = df[name].to_numpy()
+        if name == 'start_date':
+            values = pd.to_datetime(df[name]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        elif np.issubdtype(values.dtype, np.integer):
+            values = values.astype(np.int64)
+        columns[name] = values
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+def _encode(values, vocabulary):
+    """
+    Codes of values in vocabulary (-1 for missing values), appending values
+    not seen before to the end of vocabulary.
+    """
+    values = pd.Series(values, dtype=object)
+    codes = pd.Index(vocabulary, dtype=object).get_indexer(values)
+    new = values[(codes == -1) & values.notna()].unique()
+    if len(new):
+        vocabulary.extend(new)
+        codes = pd.Index(vocabulary, dtype=object).get_indexer(values)
+    codes[values.isna().to_numpy()] = -1
+    return codes
+
+
+class VoteIndex:
+
+    def __init__(self):
+        self.titles = []
+        self.options = []
+        self.parties = []
+        self.results = []
+        self.option_counts = np.zeros((0, 0), dtype=np.int32)
+        self.party_option_counts = np.zeros((0, 0, 0), dtype=np.int32)
+        self.start_dates = np.zeros(0, dtype='datetime64[ns]')
+        self.row_bill = np.zeros(0, dtype=np.int32)
+        self.row_hashes = np.zeros(0, dtype=np.uint64)
+        self.last_vote_id = None
+        self._title_ids = {}
+        self._offsets = self._order = None
+
+    # Lookups ################################################################################################
+
+    @property
+    def rows_indexed(self):
+        return len(self.row_bill)
+
+    def bill_id(self, title):
+        return self._title_ids[title]
+
+    def tally(self, bill_id, options=None):
+        """Vote count per option for one bill, in the order of options."""
+        counts = pd.Series(self.option_counts[bill_id], index=self.options)
+        return counts if options is None else counts.reindex(options, fill_value=0)
+
+    def party_tally(self, bill_id, options=None):
+        """voter_party x option vote counts for one bill (parties that voted only)."""
+        counts = self.party_option_counts[bill_id]
+        voted = counts.sum(axis=1) > 0
+        df = pd.DataFrame(counts[voted], index=pd.Index(self.parties, name='voter_party')[voted], columns=self.options)
+        return df if options is None else df.reindex(columns=options, fill_value=0)
+
+    def result(self, bill_id):
+        return self.results[bill_id]
+
+    def start_date(self, bill_id):
+        return pd.Timestamp(self.start_dates[bill_id])
+
+    def rows(self, bill_id):
+        """Positions of the bill's rows in the raw table."""
+        if self._offsets is None:
+            valid = self.row_bill >= 0
+            self._order = np.flatnonzero(valid)[np.argsort(self.row_bill[valid], kind='stable')]
+            self._offsets = np.concatenate([[0], np.cumsum(np.bincount(self.row_bill[valid], minlength=len(self.titles)))])
+        return self._order[self._offsets[bill_id]:self._offsets[bill_id + 1]]
+
+    # Building ###############################################################################################
+
+    def _grow(self):
+        b, p, o = len(self.titles), len(self.parties), len(self.options)
+        ob, oo = self.option_counts.shape
+        self.option_counts = np.pad(self.option_counts, ((0, b - ob), (0, o - oo)))
+        _, op, _ = self.party_option_counts.shape
+        self.party_option_counts = np.pad(self.party_option_counts, ((0, b - ob), (0, p - op), (0, o - oo)))
+        self.start_dates = np.concatenate([self.start_dates, np.full(b - ob, np.datetime64('NaT'), dtype='datetime64[ns]')])
+        self.results.extend([None] * (b - ob))
+
+    def append(self, new_rows):
+        """
+        Add rows appended to the raw table since the last update. Only the
+        tallies of the bills those rows belong to change.
+        """
+        if len(new_rows) == 0:
+            return self
+
+        bill = _encode(new_rows['title'], self.titles)
+        option = _encode(new_rows['option'], self.options)
+        party = _encode(new_rows['voter_party'], self.parties)
+        self._grow()
+        self._title_ids = {title: i for i, title in enumerate(self.titles)}
+
+        counted = (bill >= 0) & (option >= 0)
+        np.add.at(self.option_counts, (bill[counted], option[counted]), 1)
+        by_party = counted & (party >= 0)
+        np.add.at(self.party_option_counts, (bill[by_party], party[by_party], option[by_party]), 1)
+
+        # Bill-level fields come from the bill's latest row
+        latest = pd.DataFrame({'bill': bill, 'result': new_rows['result'].to_numpy(dtype=object),
+                               'start_date': pd.to_datetime(new_rows['start_date']).to_numpy()})
+        latest = latest[latest['bill'] >= 0].drop_duplicates('bill', keep='last')
+        for b, result in zip(latest['bill'], latest['result']):
+            self.results[b] = None if pd.isna(result) else result
+        self.start_dates[latest['bill'].to_numpy()] = latest['start_date'].to_numpy(dtype='datetime64[ns]')
+
+        self.row_bill = np.concatenate([self.row_bill, bill.astype(np.int32)])
+        self.row_hashes = np.concatenate([self.row_hashes, row_hashes(new_rows)])
+        self.last_vote_id = str(new_rows['vote_id'].iloc[-1])
+        self._offsets = self._order = None
+        return self
+
+    def is_prefix_of(self, df):
+        """Whether df is the indexed table with (possibly) more rows appended, checked row by row."""
+        if len(df) < self.rows_indexed or len(self.row_hashes) != self.rows_indexed:
+            return False
+        if self.rows_indexed == 0:
+            return True
+        return np.array_equal(row_hashes(df.iloc[:self.rows_indexed]), self.row_hashes)
+
+    # Persistence ############################################################################################
+
+    def save(self, directory):
+        with atomic_directory(directory) as tmp:
+            for name in _ARRAYS:
+                np.save(os.path.join(tmp, f'{name}.npy'), getattr(self, name), allow_pickle=False)
+            meta = dict(titles=self.titles, options=self.options, parties=self.parties, results=self.results,
+                        last_vote_id=self.last_vote_id)
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory):
+        index = cls()
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        for name in ('titles', 'options', 'parties', 'results', 'last_vote_id'):
+            setattr(index, name, meta[name])
+        for name in _ARRAYS:
+            setattr(index, name, np.load(os.path.join(directory, f'{name}.npy'), allow_pickle=False))
+        index._title_ids = {title: i for i, title in enumerate(index.titles)}
+        return index
+
+
+def index_path(name, directory=INDEX_DIR):
+    return os.path.join(directory, name)
+
+
+def build_index(df, name='VOTE_RESULTS_2', directory=INDEX_DIR, save=True):
+    """
+    Load the saved index for name and bring it up to date with df: new rows
+    are appended incrementally, anything else triggers a full rebuild.
+    """
+    path = index_path(name, directory)
+    try:
+        index = VoteIndex.load(path)
+    except (OSError, ValueError, KeyError):
+        index = None
+
+    if index is not None and index.is_prefix_of(df):
+        if len(df) == index.rows_indexed:
+            return index
+        index.append(df.iloc[index.rows_indexed:])
+    else:
+        index = VoteIndex().append(df)
+
+    if save:
+        index.save(path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('name', nargs='?', default='VOTE_RESULTS_2')
+    args = parser.parse_args()
+
+    index = build_index(read_table(args.name), args.name)
+    print(f'{args.name}: {len(index.titles)} bills, {len(index.parties)} parties, {index.rows_indexed} rows indexed')
+
+
+if __name__ == '__main__':
+    main()
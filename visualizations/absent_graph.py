@@ -1,10 +1,24 @@
 import base64
+import mimetypes
 import requests
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
+from utils.loaders import absence_index, datasets, has_vote_records
+from utils.tracing import traced
+from visualizations.avatar_store import avatar_store
+from visualizations.bubble_packing import pack_bubbles
+from visualizations.bubble_sprite import composite_bubbles
+from visualizations.figure_payload import ImagePayload
+from visualizations.layout_cache import LAYOUT_COLUMNS, layout_cache, layout_key
+
+# Chart drawn on the overview page, every member (None) with a photo on bubbles of at least MIN_IMAGE_RADIUS pixels
+PLOT_DIAMETER = 800
+MAX_MEMBERS = None
+MIN_IMAGE_RADIUS = 8
+
 # Helper function for clipping the image into circle
 def make_circular_image(url, diameter):
     """
@@ -41,6 +55,7 @@ def make_circular_image_v2(path, diameter):
     with open(path, "rb") as f:
         img_data = f.read()
     img_b64 = base64.b64encode(img_data).decode("utf-8")
+    mime = mimetypes.guess_type(path)[0] or "image/jpeg"
 
     # Create circular SVG wrapper
     svg_template = f"""
@@ -50,7 +65,7 @@ def make_circular_image_v2(path, diameter):
                 <circle cx="{diameter/2}" cy="{diameter/2}" r="{diameter/2}" />
             </clipPath>
         </defs>
-        <image href="data:image/jpeg;base64,{img_b64}"
+        <image href="data:{mime};base64,{img_b64}"
                width="{diameter}" height="{diameter}" clip-path="url(#circleView)" />
     </svg>
     """
@@ -69,7 +84,8 @@ class BubbleChartPlotly:
 
         total_area = np.sum(self.area)
         max_allowed_area = (np.pi * (self.plot_radius ** 2)) * 0.6
-        scale_factor = max_allowed_area / total_area
+        # No area at all (e.g. nobody absent in the window): every bubble has radius 0
+        scale_factor = max_allowed_area / total_area if total_area > 0 else 0.0
         self.scaled_area = self.area * scale_factor
         self.radii = np.sqrt(self.scaled_area / np.pi)
 
@@ -105,6 +121,23 @@ class BubbleChartPlotly:
         return np.argmin(distance, keepdims=True)
 
     def collapse(self, n_iterations=100):
+        """
+        Pack the bubbles towards their centre of mass with the vectorized,
+        grid-indexed engine in visualizations/bubble_packing.py.
+        """
+        self.bubbles[:, :2], self.n_iterations = pack_bubbles(
+            self.bubbles[:, :2],
+            self.bubbles[:, 2],
+            self.bubbles[:, 3],
+            spacing=self.bubble_spacing,
+            n_iterations=n_iterations,
+        )
+        self.com = self.center_of_mass()
+
+    def collapse_legacy(self, n_iterations=100):
+        """
+        Original one-bubble-at-a-time collapse, kept for benchmarking.
+        """
         for _ in range(n_iterations):
             moves = 0
             for i in range(len(self.bubbles)):
@@ -157,55 +190,143 @@ class BubbleChartPlotly:
             'image_url': self.image_urls
         })
 
-def plot_bubble_chart_with_images(df, plot_diameter=500):
-    chart = BubbleChartPlotly(
-        labels=df["label"],
-        area=df["size"],
-        image_urls=df["image_url"],
-        bubble_spacing=1,
-        plot_diameter=plot_diameter
-    )
+@traced
+def bubble_layout(df, plot_diameter=500, bubble_spacing=1, cache=layout_cache):
+    """
+    Packed layout of df (same rows as BubbleChartPlotly.to_dataframe()),
+    served from the layout cache whenever the labels, sizes and plot
+    parameters have been packed before.
+    """
+    def compute():
+        chart = BubbleChartPlotly(
+            labels=df["label"],
+            area=df["size"],
+            image_urls=df["image_url"],
+            bubble_spacing=bubble_spacing,
+            plot_diameter=plot_diameter
+        )
+        chart.collapse()
+        return chart.to_dataframe()
+
+    # Nothing to draw, the packing needs a positive total area
+    if not (df["size"] > 0).any():
+        return pd.DataFrame({name: np.zeros(0) for name in LAYOUT_COLUMNS}).assign(label=[], image_url=[])
+
+    if cache is None:
+        return compute()
+
+    key = layout_key(df["label"], df["size"], plot_diameter, bubble_spacing)
+    columns = cache.get_or_compute(key, compute)
+    df_bubbles = pd.DataFrame({name: columns[name] for name in LAYOUT_COLUMNS})
+    df_bubbles['label'] = df["label"].to_numpy()
+    df_bubbles['image_url'] = df["image_url"].to_numpy()
+    return df_bubbles
+
+@traced
+def plot_bubble_chart_with_images(df, plot_diameter=500, render_mode='images', sprite_tiles=1,
+                                  min_image_radius=0, marker_color='#c9ced6'):
+    """
+    Packed bubble chart with a photo per member. render_mode 'images' adds
+    one layout image per bubble, each distinct photo embedded once at its
+    drawn size (visualizations/figure_payload.py), 'sprite' composites all
+    photos server-side into one image (or sprite_tiles x sprite_tiles
+    tiles), which keeps the figure payload small and pan/zoom smooth. 'svg'
+    is the original double base64 SVG per bubble, kept for benchmarking.
+
+    Level of detail: bubbles under min_image_radius pixels (at plot_diameter)
+    are drawn as plain marker_color circles, only the larger ones get a photo.
+    """
+    if render_mode not in ('images', 'sprite', 'svg'):
+        raise ValueError(f"render_mode must be 'images', 'sprite' or 'svg', got {render_mode!r}")
 
-    chart.collapse()
-    df_bubbles = chart.to_dataframe()
+    df_bubbles = bubble_layout(df, plot_diameter=plot_diameter, bubble_spacing=1)
+
+    # Fix the axes to the packed bubbles
+    x, y, r = df_bubbles["x"].to_numpy(), df_bubbles["y"].to_numpy(), df_bubbles["radius"].to_numpy()
+    if len(df_bubbles):
+        half = max((x + r).max() - (x - r).min(), (y + r).max() - (y - r).min()) / 2 * 1.02
+        cx, cy = ((x + r).max() + (x - r).min()) / 2, ((y + r).max() + (y - r).min()) / 2
+    else:
+        half, cx, cy = plot_diameter / 2, 0.0, 0.0
+    radius_px = r * plot_diameter / (2 * half)
+    with_photo = radius_px >= min_image_radius
 
     fig = go.Figure()
 
-    # Invisible marker for interaction
+    # Marker for interaction only (hover), its size is in screen pixels
     fig.add_trace(go.Scatter(
-        x=df_bubbles["x"],
-        y=df_bubbles["y"],
+        x=x,
+        y=y,
         mode="markers",
-        marker=dict(size=df_bubbles["radius"] * 2, opacity=0),
+        marker=dict(size=radius_px * 2, color='rgba(0,0,0,0)', line_width=0),
         text=df_bubbles["label"],
         textposition="middle center",
         hovertemplate="<b>%{text}</b><extra>%{text}</extra>"
     ))
 
-    # Add images as bubbles
-    for i, row in df_bubbles.iterrows():
-        r = row["radius"]
-        diameter = int(2 * r)
-
-        svg_url = make_circular_image(row["image_url"], diameter)
-
-        fig.add_layout_image(
-            dict(
-                source=svg_url,
-                x=row["x"] - r,
-                y=row["y"] + r,
-                sizex=diameter,
-                sizey=diameter,
-                xref="x",
-                yref="y",
-                layer="above",
-                sizing="stretch",
-            )
-        )
-
+    photo_px = 2 * radius_px[with_photo]
+    df_bubbles = df_bubbles[with_photo]
+    if df_bubbles.empty:
+        images = []
+    else:
+        # Batch-download any photo the avatar store does not have yet, so the
+        # loop below only reads local files
+        avatar_store.fetch(df_bubbles["image_url"], size=avatar_store.size or int(np.ceil(2 * df_bubbles["radius"].max())))
+
+        # Pre-clipped avatars from the local store, see visualizations/avatar_store.py
+        image_paths = [avatar_store.path_for(url) for url in df_bubbles["image_url"]]
+
+        if render_mode == 'sprite':
+            images = composite_bubbles(df_bubbles, image_paths, plot_diameter, tiles=sprite_tiles)
+        elif render_mode == 'images':
+            payload = ImagePayload()
+            images = [
+                payload.add(path, diameter_px, x=x - r, y=y + r, sizex=2 * r, sizey=2 * r,
+                            xref="x", yref="y", layer="above", sizing="stretch")
+                for path, diameter_px, x, y, r in zip(image_paths, photo_px, df_bubbles["x"], df_bubbles["y"],
+                                                      df_bubbles["radius"])
+            ]
+            # Each distinct photo is embedded once, in the template
+            fig.update_layout(template=payload.template())
+        else:
+            # Add images as bubbles
+            images = []
+            for path, (i, row) in zip(image_paths, df_bubbles.iterrows()):
+                r = row["radius"]
+                diameter = int(2 * r)
+
+                svg_url = make_circular_image_v2(path, diameter)
+
+                images.append(
+                    dict(
+                        source=svg_url,
+                        x=row["x"] - r,
+                        y=row["y"] + r,
+                        sizex=diameter,
+                        sizey=diameter,
+                        xref="x",
+                        yref="y",
+                        layer="above",
+                        sizing="stretch",
+                    )
+                )
+
+    # Bubbles without a photo are circles in plot units, so like the photos they scale with the
+    # axes at whatever width the chart is drawn. Their style is set once, in the template
+    small = ~with_photo
+    shapes = [
+        dict(type="circle", xref="x", yref="y", x0=round(x0, 2), y0=round(y0, 2), x1=round(x1, 2), y1=round(y1, 2))
+        for x0, y0, x1, y1 in zip((x - r)[small], (y - r)[small], (x + r)[small], (y + r)[small])
+    ]
+    fig.update_layout(template=dict(layout=dict(shapedefaults=dict(fillcolor=marker_color, line_width=0, layer="below"))))
+
+    # Set all images and shapes at once, add_layout_image re-validates the whole list on every call
     fig.update_layout(
-        xaxis=dict(visible=False),
-        yaxis=dict(visible=False, scaleanchor="x", scaleratio=1),
+        images=images,
+        shapes=shapes,
+        xaxis=dict(visible=False, range=[cx - half, cx + half]),
+        yaxis=dict(visible=False, range=[cy - half, cy + half], scaleanchor="x", scaleratio=1),
+        showlegend=False,
         width=plot_diameter,
         height=plot_diameter,
         margin=dict(l=0, r=0, t=0, b=0)
@@ -213,7 +334,30 @@ def plot_bubble_chart_with_images(df, plot_diameter=500):
     
     return fig
 
-def absent_graph():
-    df = pd.read_pickle('./data/ABSENT_RATIO.pkl')
-    df['image_url'] = df['image_url'].fillna('https://www.gravatar.com/avatar/?d=mp&s=200')
-    return plot_bubble_chart_with_images(df[:500], plot_diameter=800)
\ No newline at end of file
+def absent_members(df):
+    df = df.copy()
+    df['image_url'] = df['image_url'].astype(object).fillna('https://www.gravatar.com/avatar/?d=mp&s=200')
+    return df
+
+def windowed_members(start=None, end=None):
+    """
+    Absence rate of every member between start and end, counted from the raw
+    vote records (utils/absence.py). Photos still come from ABSENT_RATIO.
+    Without any vote records, the all-time ABSENT_RATIO snapshot itself.
+    """
+    index = absence_index() if has_vote_records() else None
+    if index is None or not len(index.days):
+        return datasets.derived('ABSENT_RATIO', 'absent_members', absent_members)
+    df = index.by_member(start, end)
+    photos = datasets.derived('ABSENT_RATIO', 'absent_members', absent_members)
+    key = index.key if index.key in photos.columns else 'label'
+    photos = photos.drop_duplicates(key).set_index(key)['image_url']
+    df['image_url'] = df[key].map(photos)
+    return absent_members(df)
+
+@traced
+def absent_graph(render_mode='images', start=None, end=None, min_image_radius=MIN_IMAGE_RADIUS):
+    # Prepared once per process and version of the vote records, see utils/loaders.py
+    df = windowed_members(start, end)
+    return plot_bubble_chart_with_images(df[:MAX_MEMBERS], plot_diameter=PLOT_DIAMETER, render_mode=render_mode,
+                                         min_image_radius=min_image_radius)
@@ -0,0 +1,237 @@
+"""
+Local, content-addressed store of pre-clipped member avatars.
+
+Run the ingest once (and again whenever ABSENT_RATIO.pkl is refreshed):
+    python -m visualizations.avatar_store
+The bubble chart then only reads from ./data/avatars. Photos the store has
+never seen are batch-downloaded once before the figure is built, after that
+rendering makes no network calls.
+"""
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+
+import pandas as pd
+from PIL import Image, ImageChops, ImageDraw, ImageOps
+
+from utils.files import atomic_write
+from utils.tracing import traced
+from visualizations.image_fetcher import HostLatency, ImageFetcher
+
+# Placeholder absent_graph() fills in for members without a photo
+PLACEHOLDER_URL = 'https://www.gravatar.com/avatar/?d=mp&s=200'
+
+# Supersampling factor for the anti-aliased circle mask
+_MASK_SCALE = 4
+
+
+def clip_circle(img, size):
+    """
+    Centre-crop img to a square, resize it to size x size and make
+    everything outside the inscribed circle transparent.
+    """
+    img = ImageOps.fit(img.convert('RGBA'), (size, size), Image.LANCZOS)
+
+    mask = Image.new('L', (size * _MASK_SCALE, size * _MASK_SCALE), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size * _MASK_SCALE - 1, size * _MASK_SCALE - 1), fill=255)
+    mask = mask.resize((size, size), Image.LANCZOS)
+
+    img.putalpha(ImageChops.multiply(img.getchannel('A'), mask))
+    return img
+
+
+def make_fallback_avatar(size):
+    """
+    Grey head-and-shoulders silhouette, drawn locally so missing photos
+    never need a network call.
+    """
+    big = size * _MASK_SCALE
+    img = Image.new('RGBA', (big, big), '#C9CED3')
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((big * 0.32, big * 0.18, big * 0.68, big * 0.54), fill='#F1F3F4')
+    draw.ellipse((big * 0.16, big * 0.60, big * 0.84, big * 1.20), fill='#F1F3F4')
+    return clip_circle(img, size)
+
+
+def encode_png(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+class AvatarStore:
+    """
+    Avatars are stored as <sha256>.png, so identical photos are kept once. A
+    manifest maps every source URL to its file and records the size the
+    images were rendered at.
+    """
+
+    def __init__(self, directory='./data/avatars'):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self._lock = threading.Lock()
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path, encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                self._manifest = dict(size=None, fallback=None, images={})
+            self._manifest.setdefault('failed', [])
+        return self._manifest
+
+    @property
+    def size(self):
+        return self.manifest['size']
+
+    def _write(self, data):
+        name = f'{hashlib.sha256(data).hexdigest()}.png'
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            atomic_write(path, data)
+        return name
+
+    def add(self, url, image_bytes, size):
+        """
+        Clip, resize and store the photo downloaded from url.
+        """
+        img = clip_circle(Image.open(io.BytesIO(image_bytes)), size)
+        name = self._write(encode_png(img))
+        with self._lock:
+            self.manifest['images'][url] = name
+        return name
+
+    def __contains__(self, url):
+        return url in self.manifest['images']
+
+    def missing(self, urls, retry_failed=False):
+        """
+        Unique URLs from urls that have no stored avatar yet. URLs that
+        already failed to download are skipped unless retry_failed is set.
+        """
+        failed = set() if retry_failed else set(self.manifest['failed'])
+        return [url for url in dict.fromkeys(urls)
+                if isinstance(url, str) and url not in self and url not in failed]
+
+    @traced('avatar_store.fetch')
+    def fetch(self, urls, size, fetcher=None, retry_failed=False):
+        """
+        Download and store every photo in urls the store does not have yet,
+        concurrently and each unique URL once. Returns {url: exception} for
+        the downloads that failed, those fall back to the placeholder avatar.
+        """
+        urls = self.missing(urls, retry_failed=retry_failed)
+        if not urls:
+            return {}
+
+        if self.size != size:
+            self.manifest.update(size=size, fallback=None, images={}, failed=[])
+
+        own_fetcher = fetcher is None
+        fetcher = ImageFetcher() if own_fetcher else fetcher
+        try:
+            fetched, failed = fetcher.fetch_all(urls)
+        finally:
+            if own_fetcher:
+                fetcher.close()
+
+        for url, data in fetched.items():
+            try:
+                self.add(url, data, size)
+            except OSError as e:
+                failed[url] = e
+
+        with self._lock:
+            self.manifest['failed'] = sorted((set(self.manifest['failed']) - set(fetched)) | set(failed))
+        self.save()
+        return failed
+
+    def fallback_path(self):
+        with self._lock:
+            name = self.manifest['fallback']
+            if name is None or not os.path.exists(os.path.join(self.directory, name)):
+                name = self._write(encode_png(make_fallback_avatar(self.size or 200)))
+                self.manifest['fallback'] = name
+        return os.path.join(self.directory, name)
+
+    def path_for(self, url):
+        """
+        Local file for url, or the fallback avatar when the photo was never
+        ingested (or failed to download).
+        """
+        name = self.manifest['images'].get(url) if isinstance(url, str) else None
+        if name is None:
+            return self.fallback_path()
+        return os.path.join(self.directory, name)
+
+    def save(self):
+        with self._lock:
+            payload = json.dumps(self.manifest, ensure_ascii=False, indent=1)
+        atomic_write(self.manifest_path, payload)
+
+
+avatar_store = AvatarStore()
+
+
+def largest_diameter(df, plot_diameter, bubble_spacing=1):
+    """
+    Largest bubble diameter (in plot units) the chart will draw for df.
+    """
+    # Imported here, absent_graph itself depends on this module
+    from visualizations.absent_graph import BubbleChartPlotly
+
+    chart = BubbleChartPlotly(df['label'], df['size'], df['image_url'],
+                              bubble_spacing=bubble_spacing, plot_diameter=plot_diameter)
+    return int(math.ceil(2 * chart.radii.max()))
+
+
+def ingest(data_path='./data/ABSENT_RATIO.pkl', store=avatar_store, size=None, fetcher=None):
+    """
+    Download every image_url in data_path once and store it pre-clipped at
+    size pixels (by default the largest diameter absent_graph() draws).
+    """
+    from visualizations.absent_graph import MAX_MEMBERS, PLOT_DIAMETER
+
+    df = pd.read_pickle(data_path)
+    if size is None:
+        size = largest_diameter(df[:MAX_MEMBERS], PLOT_DIAMETER)
+
+    # Re-render everything when the target size changes
+    if store.size != size:
+        store.manifest.update(size=size, fallback=None, images={}, failed=[])
+
+    urls = store.missing(list(df['image_url']) + [PLACEHOLDER_URL], retry_failed=True)
+    failed = store.fetch(urls, size, fetcher=fetcher, retry_failed=True)
+
+    store.fallback_path()
+    store.save()
+    return dict(size=size, downloaded=len(urls) - len(failed), failed=failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='./data/ABSENT_RATIO.pkl')
+    parser.add_argument('--size', type=int, default=None, help='avatar size in pixels')
+    args = parser.parse_args()
+
+    latency = HostLatency()
+    with ImageFetcher(on_request=latency) as fetcher:
+        result = ingest(args.data, size=args.size, fetcher=fetcher)
+
+    print(f"Stored {result['downloaded']} avatars at {result['size']}px in {avatar_store.directory}")
+    for url, e in result['failed'].items():
+        print(f'  failed (fallback used): {url}: {e}')
+    for host, stats in latency.summary().items():
+        print(f"  {host}: {stats['requests']} requests, mean {stats['mean_seconds']:.3f}s, "
+              f"max {stats['max_seconds']:.3f}s, {stats['errors']} errors")
+
+
+if __name__ == '__main__':
+    main()
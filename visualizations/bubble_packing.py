@@ -0,0 +1,274 @@
+import numpy as np
+
+# Half of the 3x3 cell neighbourhood (plus the cell itself), so every pair of
+# neighbouring cells is visited exactly once
+_HALF_NEIGHBOURHOOD = [(0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+
+def neighbor_pairs(xy, cell_size):
+    """
+    Return every pair (i, j) with i < j whose centres fall into the same or
+    adjacent cells of a uniform grid with the given cell size.
+    """
+    n = len(xy)
+    if n < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    cells = np.floor(xy / cell_size).astype(np.int64)
+    cells -= cells.min(axis=0)
+    n_cols = cells[:, 0].max() + 3
+    keys = (cells[:, 1] + 1) * n_cols + (cells[:, 0] + 1)
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    ids = np.arange(n)
+
+    all_i, all_j = [], []
+    for dx, dy in _HALF_NEIGHBOURHOOD:
+        target = keys + dy * n_cols + dx
+        lo = np.searchsorted(sorted_keys, target, side='left')
+        hi = np.searchsorted(sorted_keys, target, side='right')
+        counts = hi - lo
+        total = counts.sum()
+        if total == 0:
+            continue
+
+        # Expand every [lo, hi) range into explicit candidate indices
+        i = np.repeat(ids, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        j = order[np.repeat(lo, counts) + offsets]
+
+        if (dx, dy) == (0, 0):
+            keep = i < j
+            i, j = i[keep], j[keep]
+        all_i.append(i)
+        all_j.append(j)
+
+    if not all_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(all_i), np.concatenate(all_j)
+
+
+def _close_pairs(xy, radii, spacing, skin):
+    """
+    Neighbour list of the pairs that are, or may come within `skin` of,
+    touching.
+    """
+    i, j = neighbor_pairs(xy, 2 * radii.max() + spacing + skin + 1e-9)
+    gap = np.hypot(*(xy[j] - xy[i]).T) - radii[i] - radii[j] - spacing
+    close = gap < skin
+    return i[close], j[close]
+
+
+def _separate(xy, radii, weights, spacing, pairs, n_passes):
+    """
+    Push overlapping bubbles apart. Every pass resolves all overlapping pairs
+    of the neighbour list at once, the lighter bubble of a pair moves further
+    than the heavier one. Returns the largest overlap left after the passes.
+    """
+    n = len(xy)
+    i_all, j_all = pairs
+    total = weights[i_all] + weights[j_all]
+    share_all = np.where(total > 0, weights[j_all] / np.where(total > 0, total, 1), 0.5)
+    reach_all = radii[i_all] + radii[j_all] + spacing
+
+    for _ in range(n_passes):
+        delta = xy[j_all] - xy[i_all]
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        hit = reach_all - dist > 0
+        if not hit.any():
+            return 0.0
+
+        i, j, delta, dist = i_all[hit], j_all[hit], delta[hit], dist[hit]
+        overlap, share = reach_all[hit] - dist, share_all[hit]
+
+        # Coincident centres get an arbitrary but deterministic direction
+        same = dist == 0
+        if same.any():
+            angle = i[same] * 2.399963229728653
+            delta[same] = np.column_stack([np.cos(angle), np.sin(angle)])
+            dist[same] = 1.0
+        direction = delta / dist[:, None]
+
+        push_i = direction * (overlap * share)[:, None]
+        push_j = direction * (overlap * (1 - share))[:, None]
+        xy[:, 0] += np.bincount(j, push_j[:, 0], n) - np.bincount(i, push_i[:, 0], n)
+        xy[:, 1] += np.bincount(j, push_j[:, 1], n) - np.bincount(i, push_i[:, 1], n)
+
+    overlap = reach_all - np.hypot(*(xy[j_all] - xy[i_all]).T)
+    return max(overlap.max(initial=0), 0.0)
+
+
+def _initial_layout(radii, weights, spacing):
+    """
+    Spiral start with the largest bubbles in the middle, each ring as far out
+    as the area of the bubbles inside it requires. Remaining overlaps are
+    pushed apart and, if any survive, a uniform rescale removes them.
+    """
+    n = len(radii)
+    order = np.argsort(-radii, kind='stable')
+    footprint = np.cumsum(np.pi * (radii[order] + spacing / 2) ** 2)
+    ring = np.sqrt(footprint / (np.pi * 0.8))
+    angle = np.arange(n) * 2.399963229728653
+
+    xy = np.empty((n, 2))
+    xy[order, 0] = ring * np.cos(angle)
+    xy[order, 1] = ring * np.sin(angle)
+
+    for _ in range(6):
+        pairs = _close_pairs(xy, radii, spacing, radii.mean())
+        if _separate(xy, radii, weights, spacing, pairs, 8) == 0:
+            break
+
+    i, j = _close_pairs(xy, radii, spacing, 0)
+    if len(i):
+        dist = np.maximum(np.hypot(*(xy[j] - xy[i]).T), 1e-12)
+        xy = xy * ((radii[i] + radii[j] + spacing) / dist).max()
+    return xy
+
+
+def _centre(xy, weights):
+    if weights.sum() > 0:
+        return np.average(xy, axis=0, weights=weights)
+    return xy.mean(axis=0)
+
+
+def _blocked(current, proposed, moving, reach, i, j):
+    """
+    Flag the bubbles whose proposed position would touch a neighbour, either
+    where the neighbour is now or where the neighbour is about to move.
+    """
+    blocked = np.zeros(len(current), dtype=bool)
+    gaps = []
+    for a, b in [(i, j), (j, i)]:
+        m = moving[a]
+        a, b, r = a[m], b[m], reach[m]
+        gap_now = np.hypot(*(current[b] - proposed[a]).T) - r
+        gap_next = np.hypot(*(proposed[b] - proposed[a]).T) - r
+        hit = (gap_now < 0) | (gap_next < 0)
+        blocked[a[hit]] = True
+        gaps.append((a[hit], b[hit], np.minimum(gap_now, gap_next)[hit]))
+    return blocked, gaps
+
+
+def _closest_neighbor(n, gaps):
+    """For every bubble, the neighbour it would overlap the most."""
+    a = np.concatenate([g[0] for g in gaps])
+    b = np.concatenate([g[1] for g in gaps])
+    gap = np.concatenate([g[2] for g in gaps])
+    order = np.lexsort((gap, a))
+    a, b = a[order], b[order]
+    first = np.ones(len(a), dtype=bool)
+    first[1:] = a[1:] != a[:-1]
+    closest = np.full(n, -1)
+    closest[a[first]] = b[first]
+    return closest
+
+
+def pack_bubbles(xy, radii, weights, spacing=0, step_dist=None, n_iterations=100, tol=1e-2):
+    """
+    Pack circles towards their weighted centre of mass.
+
+    Same moves as the original one-bubble-at-a-time collapse, but every bubble
+    proposes its step towards the centre at once and a move is only accepted
+    when it cannot collide with any neighbour, whether that neighbour moves or
+    not. Blocked bubbles then try to slide sideways around the bubble in their
+    way. The neighbour list comes from a uniform grid, the step is halved when
+    fewer than 5% of the bubbles moved and the loop stops early once the step
+    becomes negligible. Bubbles never overlap at any point. Returns the new
+    (n, 2) positions and the number of iterations that ran.
+
+    Radii and weights must be finite and non-negative (ValueError otherwise).
+    """
+    xy = np.array(xy, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    if not (np.isfinite(radii).all() and (radii >= 0).all()):
+        raise ValueError('radii must be finite and non-negative')
+    if not (np.isfinite(weights).all() and (weights >= 0).all()):
+        raise ValueError('weights must be finite and non-negative')
+    n = len(xy)
+    if n < 2:
+        return xy, 0
+
+    max_radius = radii.max()
+    if step_dist is None:
+        # The spiral start is already close to packed, so small steps suffice
+        step_dist = radii.mean() / 2 + spacing / 2
+    min_step = tol * max(max_radius, 1e-12)
+
+    xy = _initial_layout(radii, weights, spacing) + xy.mean(axis=0)
+
+    # Pairs further than skin apart when the neighbour list is built cannot
+    # touch before one of the two has moved skin / 2. A bubble moves at most
+    # step_dist per iteration (straight or sliding), so the list is rebuilt
+    # before this iteration's moves could take any bubble past that. A skin of
+    # 4.5 steps keeps one list for two full steps
+    skin = 0.0
+    anchor = None
+    iteration = 0
+    for iteration in range(1, n_iterations + 1):
+        com = _centre(xy, weights)
+        if anchor is None or np.hypot(*(xy - anchor).T).max() + step_dist > skin / 2:
+            skin = 4.5 * step_dist
+            anchor = xy.copy()
+            i, j = _close_pairs(xy, radii, spacing, skin)
+            reach = radii[i] + radii[j] + spacing
+
+        # Step straight towards the centre of mass
+        to_com = com - xy
+        dist = np.hypot(to_com[:, 0], to_com[:, 1])
+        moving = dist > 0
+        proposed = xy.copy()
+        proposed[moving] += to_com[moving] * (step_dist / dist[moving])[:, None]
+
+        blocked, gaps = _blocked(xy, proposed, moving, reach, i, j)
+        accepted = moving & ~blocked
+        moves = accepted.sum()
+        xy[accepted] = proposed[accepted]
+
+        # Blocked bubbles slide around the neighbour they would overlap the most,
+        # on whichever side ends up closer to the centre of mass
+        closest = _closest_neighbor(n, gaps)
+        sliding = blocked & (closest >= 0)
+        if sliding.any():
+            idx = np.flatnonzero(sliding)
+            away = xy[closest[idx]] - xy[idx]
+            norm = np.hypot(away[:, 0], away[:, 1])
+            ok = norm > 0
+            idx, away, norm = idx[ok], away[ok], norm[ok]
+            orth = np.column_stack([away[:, 1], -away[:, 0]]) / norm[:, None] * step_dist
+            side1, side2 = xy[idx] + orth, xy[idx] - orth
+            closer = np.hypot(*(com - side1).T) < np.hypot(*(com - side2).T)
+
+            proposed = xy.copy()
+            proposed[idx] = np.where(closer[:, None], side1, side2)
+            sliding = np.zeros(n, dtype=bool)
+            sliding[idx] = True
+            blocked, _ = _blocked(xy, proposed, sliding, reach, i, j)
+            accepted = sliding & ~blocked
+            xy[accepted] = proposed[accepted]
+
+        if moves / n < 0.05:
+            step_dist /= 2
+            if step_dist < min_step:
+                break
+
+    return xy, iteration
+
+
+def layout_quality(xy, radii, spacing=0, tol=1e-6):
+    """
+    Return the number of overlapping pairs, the worst overlap and the radius of
+    the circle (around the centroid) that encloses the whole layout.
+    """
+    xy = np.asarray(xy, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    i, j = neighbor_pairs(xy, 2 * radii.max() + spacing + 1e-9)
+    overlap = radii[i] + radii[j] + spacing - np.hypot(*(xy[j] - xy[i]).T)
+    centre = xy.mean(axis=0)
+    return dict(
+        overlaps=int((overlap > tol).sum()),
+        max_overlap=float(max(overlap.max(initial=0), 0)),
+        packed_radius=float((np.hypot(*(xy - centre).T) + radii).max()),
+    )
@@ -0,0 +1,72 @@
+import numpy as np
+from PIL import Image
+
+from utils.tracing import traced
+from visualizations.figure_payload import encode_image
+
+
+def _load_avatar(path, diameter, cache):
+    # The same file at the same size is decoded and resized once
+    key = (path, diameter)
+    if key not in cache:
+        with Image.open(path) as img:
+            cache[key] = img.convert('RGBA').resize((diameter, diameter), Image.LANCZOS)
+    return cache[key]
+
+
+@traced
+def composite_bubbles(df_bubbles, image_paths, plot_diameter, scale=2, tiles=1,
+                      image_format='WEBP', quality=85):
+    """
+    Draw every bubble's avatar onto one transparent canvas at its packed
+    position and return Plotly layout.images entries covering the chart:
+    a single image, or tiles x tiles images when tiles > 1.
+
+    The canvas has scale pixels per screen pixel of a plot_diameter wide
+    figure, so the sprite stays sharp on high-DPI screens.
+    """
+    x = df_bubbles['x'].to_numpy()
+    y = df_bubbles['y'].to_numpy()
+    r = df_bubbles['radius'].to_numpy()
+
+    x0, x1 = (x - r).min(), (x + r).max()
+    y0, y1 = (y - r).min(), (y + r).max()
+    span = max(x1 - x0, y1 - y0)
+    px_per_unit = scale * plot_diameter / span
+
+    width = int(np.ceil((x1 - x0) * px_per_unit))
+    height = int(np.ceil((y1 - y0) * px_per_unit))
+    canvas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+
+    diameters = np.maximum(np.rint(2 * r * px_per_unit).astype(int), 1)
+    lefts = np.rint((x - r - x0) * px_per_unit).astype(int)
+    tops = np.rint((y1 - (y + r)) * px_per_unit).astype(int)
+
+    loaded = {}
+    for path, d, left, top in zip(image_paths, diameters, lefts, tops):
+        avatar = _load_avatar(path, d, loaded)
+        canvas.alpha_composite(avatar, (left, top))
+
+    # Split the canvas into tiles, each placed back at its plot coordinates
+    images = []
+    tile_w, tile_h = int(np.ceil(width / tiles)), int(np.ceil(height / tiles))
+    for row in range(tiles):
+        for col in range(tiles):
+            box = (col * tile_w, row * tile_h, min((col + 1) * tile_w, width), min((row + 1) * tile_h, height))
+            if box[0] >= box[2] or box[1] >= box[3]:
+                continue
+            tile = canvas.crop(box)
+            if tile.getbbox() is None:
+                continue
+            images.append(dict(
+                source=encode_image(tile, image_format, quality),
+                x=x0 + box[0] / px_per_unit,
+                y=y1 - box[1] / px_per_unit,
+                sizex=(box[2] - box[0]) / px_per_unit,
+                sizey=(box[3] - box[1]) / px_per_unit,
+                xref="x",
+                yref="y",
+                layer="above",
+                sizing="stretch",
+            ))
+    return images
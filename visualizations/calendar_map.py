@@ -1,46 +1,97 @@
-import pandas as pd
 import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 
+from utils.loaders import datasets
+from utils.thai_dates import thai_strftime_array
+from utils.tracing import traced
 
-def calendar_heatmap_chart():
-    # Example list of parliamentary vote dates
-    vote_dates = [
-        "2025-01-03", "2025-01-07", "2025-01-15", "2025-02-20",
-        "2025-02-25", "2025-03-05", "2025-03-12"
-    ]
+FIRST_YEAR = 2019
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
 
-    # Convert to datetime
-    vote_dates = pd.to_datetime(vote_dates)
+# Hover label of each cell
+HOVER_DATE_FORMAT = '%A %-d %B %Y'
 
-    # Generate a full date range for the year
-    year = 2025
-    all_dates = pd.date_range(start=f"{year}-01-01", end=f"{year}-12-31")
 
-    # Create a DataFrame with week number and weekday
-    df = pd.DataFrame({'date': all_dates})
-    df['week'] = df['date'].dt.isocalendar().week
-    df['weekday'] = df['date'].dt.weekday  # Monday=0, Sunday=6
-    df['vote'] = df['date'].isin(vote_dates).astype(int)  # 1 if vote occurred, else 0
+def _weekday(days):
+    # Day numbers count from 1970-01-01, a Thursday. Monday=0, Sunday=6
+    return (days + 3) % 7
 
-    # Pivot table for heatmap: weekdays as y-axis, weeks as x-axis
-    heatmap_data = df.pivot(index='weekday', columns='week', values='vote')
 
-    # Plotly heatmap
-    fig = go.Figure(data=go.Heatmap(
-        z=heatmap_data.values,
-        x=heatmap_data.columns,
-        y=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
-        colorscale='Blues',
-        hovertemplate='Week %{x}, %{y}<br>Vote: %{z}<extra></extra>'
-    ))
+def _year_start(year):
+    return int(np.datetime64(f'{year}-01-01', 'D').astype(np.int64))
 
-    fig.update_layout(
-        title=f'Parliamentary Votes Calendar {year}',
-        yaxis=dict(autorange="reversed")  # So Monday is at the top
-    )
 
-    return fig
+class VoteCalendar:
+    """
+    Votes held per day, binned once from the vote dates. The 7 x 54
+    weekday-by-week matrix of a year is built on first use and kept.
+    """
+
+    def __init__(self, dates):
+        days = pd.Series(dates).dropna().to_numpy(dtype='datetime64[D]').astype(np.int64)
+        self.first_day = min(_year_start(FIRST_YEAR), days.min()) if len(days) else _year_start(FIRST_YEAR)
+        self.counts = np.bincount(days - self.first_day) if len(days) else np.zeros(0, dtype=np.int64)
+        last_year = pd.Timestamp(days.max(), unit='D').year if len(days) else FIRST_YEAR
+        self.years = list(range(FIRST_YEAR, last_year + 1))
+        self._matrices = {}
+
+    def matrix(self, year):
+        """(counts, Thai dates) for year, both 7 x 54. Cells outside the year are NaN / ''."""
+        if year not in self._matrices:
+            start, end = _year_start(year), _year_start(year + 1)
+            days = np.arange(start, end)
+            offset = days - self.first_day
+            inside = (offset >= 0) & (offset < len(self.counts))
+            values = np.zeros(len(days))
+            values[inside] = self.counts[offset[inside]]
+
+            # Weeks start on Monday, week 0 holds January 1st
+            weekday = _weekday(days)
+            week = (days - start + _weekday(start)) // 7
+            counts = np.full((7, 54), np.nan)
+            counts[weekday, week] = values
+            dates = np.full((7, 54), '', dtype=object)
+            dates[weekday, week] = thai_strftime_array(days.astype('datetime64[D]'), HOVER_DATE_FORMAT)
+            self._matrices[year] = (counts, dates)
+        return self._matrices[year]
 
-# Test
-calendar_heatmap_chart().show()
+
+def vote_calendar(df):
+    # One date per vote held (a bill on a day, as the detail page groups them), not per member voting.
+    # vote_id identifies a member's vote, so it cannot tell votes apart
+    days = pd.to_datetime(df['start_date']).to_numpy(dtype='datetime64[D]')
+    votes = pd.DataFrame({'title': pd.factorize(df['title'])[0], 'day': days})
+    return VoteCalendar(days[~votes.duplicated().to_numpy()])
+
+
+@traced
+def calendar_heatmap_chart(years=None, name='VOTE_RESULTS_2'):
+    # Binned once per process and version of the vote table, see utils/loaders.py
+    calendar = datasets.derived(name, 'vote_calendar', vote_calendar)
+    years = calendar.years if years is None else list(years)
+    zmax = max(calendar.counts.max(initial=0), 1)
+
+    fig = make_subplots(rows=len(years), cols=1, subplot_titles=[str(year) for year in years],
+                        vertical_spacing=0.25 / max(len(years), 1))
+    for row, year in enumerate(years, start=1):
+        counts, dates = calendar.matrix(year)
+        fig.add_trace(go.Heatmap(
+            z=counts,
+            customdata=dates,
+            y=WEEKDAYS,
+            colorscale='Blues',
+            zmin=0,
+            zmax=zmax,
+            xgap=2,
+            ygap=2,
+            showscale=row == 1,
+            hoverongaps=False,
+            hovertemplate='%{customdata}<br>Votes: %{z}<extra></extra>'
+        ), row=row, col=1)
+        fig.update_yaxes(autorange='reversed', row=row, col=1)  # So Monday is at the top
+        fig.update_xaxes(showticklabels=False, row=row, col=1)
+
+    fig.update_layout(height=160 * len(years) + 60, margin=dict(t=40, b=20))
+    return fig
@@ -0,0 +1,275 @@
+"""
+Cache of the overview page's finished figures, as Plotly JSON.
+
+A figure is keyed on the version of the data it is drawn from, its
+parameters, the source of the code that draws it (so a deploy that changes a
+builder does not keep serving old figures from disk) and, for figures that
+depend on today's date (the timeline), the day. On a hit the page gets the figure back without importing or calling the
+builder. Entries live in memory and as one file each under
+./data/cache/figures, both bounded by size (least recently used go first).
+
+Warm the cache after a deploy so the first visitor does not build anything:
+    python -m visualizations.figure_cache
+    python -m visualizations.figure_cache --force   # rebuild even if cached
+"""
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import plotly
+import plotly.io as pio
+
+from utils.files import atomic_open
+from utils.loaders import KeyLocks, datasets, file_signature
+from utils.tracing import span
+
+# Bump to drop every cached figure, for changes the source hashes below do not see
+FIGURE_VERSION = 1
+
+# Modules every builder that reads a dataset goes through
+DATA_CODE = ['utils.loaders', 'utils.datastore', 'utils.manifest']
+
+# name -> builder ('module:function'), every other module it depends on
+# (utils.tracing aside, it does not change a figure), the datasets and files
+# it reads, and whether it changes with the date
+FIGURES = {
+    'timeline': dict(builder='visualizations.timeline_gantt_chart:timeline_gantt_chart', code=['utils.thai_dates'],
+                     daily=True),
+    'calendar': dict(builder='visualizations.calendar_map:calendar_heatmap_chart',
+                     code=['utils.thai_dates'] + DATA_CODE, data=['VOTE_RESULTS_2']),
+    'absent_graph': dict(builder='visualizations.absent_graph:absent_graph',
+                         code=['utils.absence', 'visualizations.avatar_store', 'visualizations.bubble_packing',
+                               'visualizations.bubble_sprite', 'visualizations.figure_payload',
+                               'visualizations.image_fetcher', 'visualizations.layout_cache'] + DATA_CODE,
+                         data=['ABSENT_RATIO', 'VOTE_RESULTS_2'],
+                         files=['./data/avatars/manifest.json'],
+                         params=dict(render_mode='sprite', start=None, end=None, min_image_radius=8)),
+}
+
+_source_digests = {}  # path -> (file signature, sha256 of the source)
+
+
+def _file_version(path):
+    try:
+        return file_signature(path)
+    except FileNotFoundError:
+        return None
+
+
+def _data_version(name):
+    try:
+        return datasets.signature(name)
+    except FileNotFoundError:
+        return None
+
+
+def _source_digest(module):
+    # Located without importing the module, a cache hit never imports the builder
+    path = importlib.util.find_spec(module).origin
+    signature = file_signature(path)
+    cached = _source_digests.get(path)
+    if cached is None or cached[0] != signature:
+        with open(path, 'rb') as f:
+            cached = _source_digests[path] = (signature, hashlib.sha256(f.read()).hexdigest())
+    return cached[1]
+
+
+def _code_version(spec):
+    modules = [spec['builder'].split(':')[0]] + spec.get('code', [])
+    return [FIGURE_VERSION, plotly.__version__] + [_source_digest(module) for module in modules]
+
+
+def figure_key(name, params=None, today=None):
+    """Content key of a figure: its data versions, parameters and (if daily) the day."""
+    spec = FIGURES[name]
+    params = dict(spec.get('params', {}), **(params or {}))
+    parts = dict(
+        name=name,
+        params=sorted(params.items()),
+        code=_code_version(spec),
+        data=[_data_version(dataset) for dataset in spec.get('data', [])],
+        files=[_file_version(path) for path in spec.get('files', [])],
+        day=(today or date.today()).isoformat() if spec.get('daily') else None,
+    )
+    return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+
+class FigureCache:
+
+    def __init__(self, directory='./data/cache/figures', max_memory_bytes=64 * 2**20, max_disk_bytes=256 * 2**20):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._key_lock = KeyLocks()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def _remember(self, key, text, build_seconds):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old['text'])
+            self._entries[key] = dict(text=text, build_seconds=build_seconds)
+            self._memory_bytes += len(text)
+            while self._memory_bytes > self.max_memory_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_bytes -= len(evicted['text'])
+
+    def get(self, key):
+        """Figure JSON for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self.seconds_saved += entry['build_seconds']
+                return entry['text']
+
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                stored = json.load(f)
+            os.utime(self._path(key))  # last use, for eviction
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._remember(key, stored['figure'], stored['build_seconds'])
+        with self._lock:
+            self.disk_hits += 1
+            self.seconds_saved += stored['build_seconds']
+        return stored['figure']
+
+    def put(self, key, text, build_seconds=0.0):
+        self._remember(key, text, build_seconds)
+
+        with atomic_open(self._path(key)) as f:
+            json.dump(dict(figure=text, build_seconds=build_seconds), f)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def get_or_build(self, name, params=None, today=None, force=False):
+        """Figure JSON for name, building (and storing) it on a miss, or always with force."""
+        key = figure_key(name, params, today)
+        text = None if force else self.get(key)
+        if text is not None:
+            return text
+
+        # One session builds, the others wait for it
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and not force:
+                return entry['text']
+
+            spec = FIGURES[name]
+            module, function = spec['builder'].split(':')
+            builder = getattr(importlib.import_module(module), function)
+            start = time.perf_counter()
+            fig = builder(**dict(spec.get('params', {}), **(params or {})))
+            with span(f'to_json {name}') as s:
+                s.result = text = pio.to_json(fig, validate=False)
+            # Building can change an input (e.g. avatars fetched into the store),
+            # file the figure under what it was actually built from
+            self.put(figure_key(name, params, today), text, time.perf_counter() - start)
+            return text
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+        if disk and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return dict(
+            memory_hits=self.memory_hits,
+            disk_hits=self.disk_hits,
+            misses=self.misses,
+            hit_rate=hits / lookups if lookups else 0.0,
+            seconds_saved=round(self.seconds_saved, 3),
+            memory_bytes=self._memory_bytes,
+            entries_in_memory=len(self._entries),
+        )
+
+
+figure_cache = FigureCache()
+
+
+def figure_from_json(name, text):
+    with span(f'from_json {name}') as s:
+        s.result = text
+        return pio.from_json(text, skip_invalid=True)
+
+
+def cached_figure(name, **params):
+    """The figure called name (see FIGURES), from the cache when it is current."""
+    with span(f'figure {name}'):
+        return figure_from_json(name, figure_cache.get_or_build(name, params))
+
+
+def submit_figure(name, **params):
+    """
+    Start loading (or building) the figure called name on the background
+    worker pool (utils/jobs.py). Returns a Future of its JSON, turn it into a
+    figure on the script thread with figure_from_json(). Sessions asking for
+    the same figure while it builds share one job.
+    """
+    from utils.jobs import jobs
+
+    return jobs.submit((f'figure {name}', figure_key(name, params)), figure_cache.get_or_build, name, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('names', nargs='*', help=f'figures to warm (default: all of {", ".join(FIGURES)})')
+    parser.add_argument('--force', action='store_true', help='rebuild even when a current entry is cached')
+    args = parser.parse_args()
+
+    for name in args.names or FIGURES:
+        start = time.perf_counter()
+        text = figure_cache.get_or_build(name, force=args.force)
+        print(f'{name}: {len(text) / 1024:.0f} KiB in {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Compact layout images for Plotly figures.
+
+The original per-bubble images wrap the photo in an SVG clip path: the photo
+is base64-encoded inside the SVG and the SVG is base64-encoded again, and the
+same placeholder avatar is repeated for every member without a photo.
+
+ImagePayload instead
+  - hashes every image file and embeds each distinct image only once, as a
+    named image of the figure's template; every bubble refers to it by
+    templateitemname (Plotly fills in the source from the template)
+  - encodes it once, as WebP (or PNG), at exactly the largest size it is
+    drawn at (times scale for high-DPI screens), no SVG wrapper
+The avatars in the store are already clipped to a circle with a transparent
+background, both formats keep that.
+
+    payload = ImagePayload()
+    images = [payload.add(path, x=..., y=..., sizex=..., sizey=..., diameter_px=...) for ...]
+    fig.update_layout(images=images, template=payload.template())
+    payload.stats()   # images, distinct images, encoded bytes
+"""
+import base64
+import hashlib
+import io
+
+import plotly.graph_objects as go
+import plotly.io as pio
+from PIL import Image
+
+
+def encode_image(img, image_format='WEBP', quality=85):
+    """PIL image as a data URL, WebP (lossy, with alpha) or PNG."""
+    buffer = io.BytesIO()
+    if image_format == 'WEBP':
+        img.save(buffer, format='WEBP', quality=quality, method=4)
+    else:
+        img.save(buffer, format='PNG', optimize=True)
+    mime = 'image/webp' if image_format == 'WEBP' else 'image/png'
+    return f'data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode("utf-8")}'
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class ImagePayload:
+
+    def __init__(self, image_format='WEBP', quality=85, scale=2):
+        self.image_format = image_format
+        self.quality = quality
+        self.scale = scale
+
+        self._digests = {}  # path -> content hash
+        self._uses = {}     # content hash -> [path, largest diameter in pixels]
+        self.images = 0
+        self.encoded_bytes = 0
+
+    def add(self, path, diameter_px, **placement):
+        """
+        Layout image entry for path drawn diameter_px screen pixels wide at
+        placement (x, y, sizex, sizey, xref, ...).
+        """
+        digest = self._digests.get(path)
+        if digest is None:
+            digest = self._digests[path] = file_digest(path)
+        use = self._uses.setdefault(digest, [path, 0])
+        use[1] = max(use[1], diameter_px)
+        self.images += 1
+        return dict(templateitemname=f'img-{digest[:16]}', **placement)
+
+    def template(self, base=None):
+        """
+        The figure's template (base, or the default Plotly template) with
+        every distinct image added once, at the largest size it is drawn at.
+        """
+        template = go.layout.Template(base if base is not None else pio.templates[pio.templates.default])
+        named = []
+        self.encoded_bytes = 0
+        for digest, (path, diameter_px) in self._uses.items():
+            size = max(int(round(diameter_px * self.scale)), 1)
+            with Image.open(path) as img:
+                source = encode_image(img.convert('RGBA').resize((size, size), Image.LANCZOS),
+                                      self.image_format, self.quality)
+            self.encoded_bytes += len(source)
+            named.append(dict(name=f'img-{digest[:16]}', source=source))
+        template.layout.images = named
+        return template
+
+    def stats(self):
+        return dict(images=self.images, distinct=len(self._uses), encoded_bytes=self.encoded_bytes)
+
+
+def payload_bytes(fig):
+    """Size of the figure as sent to the browser (Plotly JSON)."""
+    return len(pio.to_json(fig, validate=False))
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses worth another attempt, anything else is final
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class HostLatency:
+    """
+    Instrumentation hook for ImageFetcher that aggregates request latency
+    per host. Pass an instance as on_request and read summary() afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = defaultdict(lambda: dict(requests=0, errors=0, total_seconds=0.0, max_seconds=0.0))
+
+    def __call__(self, host, url, seconds, status, attempt):
+        with self._lock:
+            stats = self._hosts[host]
+            stats['requests'] += 1
+            stats['errors'] += not isinstance(status, int) or status >= 400
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def summary(self):
+        with self._lock:
+            return {
+                host: dict(stats,
+                           mean_seconds=stats['total_seconds'] / stats['requests'],
+                           total_seconds=round(stats['total_seconds'], 4),
+                           max_seconds=round(stats['max_seconds'], 4))
+                for host, stats in self._hosts.items()
+            }
+
+
+class ImageFetcher:
+    """
+    Fetch many URLs at once over one pooled keep-alive session.
+
+    Duplicate URLs are requested once, every request has a timeout and
+    transient failures are retried with exponential backoff. on_request, if
+    given, is called after every attempt with (host, url, seconds, status or
+    exception, attempt).
+    """
+
+    def __init__(self, max_workers=16, timeout=(3.05, 10), retries=2, backoff=0.5, on_request=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.on_request = on_request
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def fetch(self, url):
+        """
+        Return the body of url, raising the last error once retries run out.
+        """
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                outcome = response.status_code
+            except requests.RequestException as e:
+                response, outcome = None, e
+
+            if self.on_request is not None:
+                self.on_request(host, url, time.perf_counter() - start, outcome, attempt)
+
+            if response is not None and outcome not in RETRY_STATUSES:
+                response.raise_for_status()
+                return response.content
+            if attempt == self.retries:
+                if response is None:
+                    raise outcome
+                response.raise_for_status()
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def _fetch_or_error(self, url):
+        try:
+            return self.fetch(url)
+        except requests.RequestException as e:
+            return e
+
+    def fetch_all(self, urls):
+        """
+        Fetch every unique URL concurrently. Returns {url: bytes} for the
+        successes and {url: exception} for the failures.
+        """
+        unique = [url for url in dict.fromkeys(urls) if isinstance(url, str)]
+        if not unique:
+            return {}, {}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique))) as pool:
+            results = dict(zip(unique, pool.map(self._fetch_or_error, unique)))
+
+        fetched = {url: r for url, r in results.items() if isinstance(r, bytes)}
+        failed = {url: r for url, r in results.items() if not isinstance(r, bytes)}
+        return fetched, failed
@@ -0,0 +1,183 @@
+"""
+Many bubble layouts at once (several charts, several diameters) packed on a
+process pool instead of one after another on the request thread.
+
+    layouts = batch_layouts([(df, 800, 1), (df, 400, 1), (senate_df, 800, 1)])
+
+Every job is looked up in the layout cache first. The sizes of the jobs that
+miss are copied once into a shared-memory block, each worker packs its slice
+and writes the geometry into a second shared block, so neither input nor
+output arrays are pickled between processes. Results come back in job order,
+shaped like BubbleChartPlotly.to_dataframe(), and are stored in the layout
+cache (memory and disk) for bubble_layout() to find later.
+
+Precompute the overview's layouts offline:
+    python -m visualizations.layout_batch --diameters 400 600 800 --groups all chamber party
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from visualizations.layout_cache import LAYOUT_COLUMNS, layout_cache, layout_key
+
+# Batches smaller than this are packed in the calling process, a pool round trip costs more
+MIN_POOL_JOBS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool(max_workers=None):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Never fork a threaded server process (Streamlit), start clean workers instead
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _executor = ProcessPoolExecutor(max_workers or os.cpu_count(), mp_context=context)
+        return _executor
+
+
+def _pack(sizes, plot_diameter, bubble_spacing):
+    """x, y, radius, size columns of one packed layout (BubbleChartPlotly.collapse)."""
+    from visualizations.absent_graph import BubbleChartPlotly
+
+    chart = BubbleChartPlotly(labels=None, area=sizes, image_urls=None,
+                              bubble_spacing=bubble_spacing, plot_diameter=plot_diameter)
+    chart.collapse()
+    return chart.bubbles[:, :4]
+
+
+def _pack_shared(sizes_name, out_name, total, offset, n, plot_diameter, bubble_spacing):
+    # Runs in a worker: read the job's sizes from, and write its layout to, shared memory
+    sizes_block = shared_memory.SharedMemory(name=sizes_name)
+    out_block = shared_memory.SharedMemory(name=out_name)
+    try:
+        sizes = np.ndarray((total,), dtype=np.float64, buffer=sizes_block.buf)
+        out = np.ndarray((total, 4), dtype=np.float64, buffer=out_block.buf)
+        start = time.perf_counter()
+        out[offset:offset + n] = _pack(sizes[offset:offset + n].copy(), plot_diameter, bubble_spacing)
+        return time.perf_counter() - start
+    finally:
+        del sizes, out
+        sizes_block.close()
+        out_block.close()
+
+
+def _to_dataframe(df, columns):
+    df_bubbles = pd.DataFrame({name: np.asarray(columns[name]) for name in LAYOUT_COLUMNS})
+    df_bubbles['label'] = df['label'].to_numpy()
+    df_bubbles['image_url'] = df['image_url'].to_numpy() if 'image_url' in df.columns else None
+    return df_bubbles
+
+
+def batch_layouts(jobs, max_workers=None, cache=layout_cache):
+    """
+    jobs is a list of (df, plot_diameter, bubble_spacing), df with label and
+    size columns (image_url is carried through). Returns one layout per job,
+    in order.
+    """
+    jobs = [(df, float(plot_diameter), float(bubble_spacing)) for df, plot_diameter, bubble_spacing in jobs]
+    keys = [layout_key(df['label'], df['size'], plot_diameter, bubble_spacing) for df, plot_diameter, bubble_spacing in jobs]
+
+    results = {}
+    if cache is not None:
+        for key in dict.fromkeys(keys):
+            columns = cache.get(key)
+            if columns is not None:
+                results[key] = columns
+
+    # Identical jobs are packed once
+    missing = {key: job for key, job in zip(keys, jobs) if key not in results}
+    if len(missing) < MIN_POOL_JOBS:
+        for key, (df, plot_diameter, bubble_spacing) in missing.items():
+            start = time.perf_counter()
+            bubbles = _pack(df['size'].to_numpy(dtype=np.float64), plot_diameter, bubble_spacing)
+            results[key] = dict(zip(LAYOUT_COLUMNS, bubbles.T))
+            if cache is not None:
+                cache.put(key, results[key], time.perf_counter() - start)
+    elif missing:
+        results.update(_pack_on_pool(missing, max_workers, cache))
+
+    return [_to_dataframe(df, results[key]) for key, (df, _, _) in zip(keys, jobs)]
+
+
+def _pack_on_pool(missing, max_workers, cache):
+    lengths = [len(df) for df, _, _ in missing.values()]
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int)
+    total = int(sum(lengths))
+
+    sizes_block = shared_memory.SharedMemory(create=True, size=max(total, 1) * 8)
+    out_block = shared_memory.SharedMemory(create=True, size=max(total, 1) * 4 * 8)
+    try:
+        sizes = np.ndarray((total,), dtype=np.float64, buffer=sizes_block.buf)
+        for offset, (df, _, _) in zip(offsets, missing.values()):
+            sizes[offset:offset + len(df)] = df['size'].to_numpy(dtype=np.float64)
+
+        pool = _pool(max_workers)
+        futures = [pool.submit(_pack_shared, sizes_block.name, out_block.name, total, int(offset), len(df),
+                               plot_diameter, bubble_spacing)
+                   for offset, (df, plot_diameter, bubble_spacing) in zip(offsets, missing.values())]
+        seconds = [future.result() for future in futures]
+
+        out = np.ndarray((total, 4), dtype=np.float64, buffer=out_block.buf)
+        results = {}
+        for key, offset, n, compute_seconds in zip(missing, offsets, lengths, seconds):
+            # Copy out before the block is released
+            results[key] = dict(zip(LAYOUT_COLUMNS, out[offset:offset + n].T.copy()))
+            if cache is not None:
+                cache.put(key, results[key], compute_seconds)
+        del sizes, out
+        return results
+    finally:
+        sizes_block.close()
+        sizes_block.unlink()
+        out_block.close()
+        out_block.unlink()
+
+
+def overview_jobs(df, diameters, groups, bubble_spacing=1):
+    """Layout jobs of the overview's member chart: all members, per chamber and per party, at each diameter."""
+    from utils.absence import chamber_of
+
+    parties = df['ASSUMED_PARTY'] if 'ASSUMED_PARTY' in df.columns else pd.Series('', index=df.index)
+    frames = []
+    for group in groups:
+        if group == 'all':
+            frames.append(('all', df))
+        elif group == 'chamber':
+            frames += [(chamber, part) for chamber, part in df.groupby(chamber_of(parties), sort=False)]
+        elif group == 'party':
+            frames += [(party, part) for party, part in df.groupby(parties.fillna('-'), sort=False)]
+        else:
+            raise ValueError(f'unknown group {group!r}')
+    frames = [(name, part.reset_index(drop=True)) for name, part in frames if (part['size'] > 0).any()]
+    return [(name, (part, diameter, bubble_spacing)) for name, part in frames for diameter in diameters]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--diameters', nargs='+', type=int, default=[800])
+    parser.add_argument('--groups', nargs='+', default=['all'], choices=['all', 'chamber', 'party'])
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    from visualizations.absent_graph import MAX_MEMBERS, windowed_members
+
+    df = windowed_members()[:MAX_MEMBERS]
+    named = overview_jobs(df, args.diameters, args.groups)
+
+    start = time.perf_counter()
+    batch_layouts([job for _, job in named], max_workers=args.workers)
+    print(f'{len(named)} layouts in {time.perf_counter() - start:.2f}s, cache: {layout_cache.stats()}')
+
+
+if __name__ == '__main__':
+    main()
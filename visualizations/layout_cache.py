@@ -0,0 +1,148 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.files import atomic_open
+
+# Geometry produced by BubbleChartPlotly, in the same order as the input rows
+LAYOUT_COLUMNS = ['x', 'y', 'radius', 'size']
+
+
+def layout_key(labels, sizes, plot_diameter, bubble_spacing):
+    """
+    Content hash of everything that determines a packed layout.
+    """
+    h = hashlib.sha256()
+    h.update('\x1f'.join(str(label) for label in labels).encode('utf-8'))
+    h.update(b'\x00')
+    h.update(np.ascontiguousarray(sizes, dtype=np.float64).tobytes())
+    h.update(f'|{float(plot_diameter)!r}|{float(bubble_spacing)!r}'.encode('utf-8'))
+    return h.hexdigest()
+
+
+class LayoutCache:
+    """
+    Two level cache of bubble layouts: an in-memory LRU in front of one
+    compressed .npz file per layout on disk, so layouts survive restarts and
+    are shared by every process that points at the same directory. Every date
+    window packs its own layout, the files are bounded by size too (least
+    recently used go first).
+    """
+
+    def __init__(self, directory='./data/cache/layouts', max_entries=16, max_disk_bytes=64 * 2**20):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Return the cached columns for key, or None on a miss.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self.seconds_saved += entry['compute_seconds']
+                return entry['columns']
+
+        try:
+            with np.load(self._path(key), allow_pickle=False) as npz:
+                columns = {name: npz[name] for name in LAYOUT_COLUMNS}
+                compute_seconds = float(npz['compute_seconds'])
+            os.utime(self._path(key))  # last use, for eviction
+        except (OSError, KeyError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._remember(key, dict(columns=columns, compute_seconds=compute_seconds))
+        with self._lock:
+            self.disk_hits += 1
+            self.seconds_saved += max(compute_seconds - (time.perf_counter() - start), 0.0)
+        return columns
+
+    def put(self, key, columns, compute_seconds=0.0):
+        columns = {name: np.asarray(columns[name], dtype=np.float64) for name in LAYOUT_COLUMNS}
+        self._remember(key, dict(columns=columns, compute_seconds=compute_seconds))
+
+        with atomic_open(self._path(key), 'wb') as f:
+            np.savez_compressed(f, compute_seconds=compute_seconds, **columns)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached columns for key, calling compute() to build (and
+        store) them on a miss.
+        """
+        columns = self.get(key)
+        if columns is None:
+            start = time.perf_counter()
+            columns = compute()
+            self.put(key, columns, time.perf_counter() - start)
+        return columns
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+        if disk and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return dict(
+            memory_hits=self.memory_hits,
+            disk_hits=self.disk_hits,
+            misses=self.misses,
+            hit_rate=hits / lookups if lookups else 0.0,
+            seconds_saved=round(self.seconds_saved, 3),
+            entries_in_memory=len(self._entries),
+        )
+
+
+layout_cache = LayoutCache()
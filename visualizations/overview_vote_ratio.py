@@ -1,6 +1,9 @@
 import pandas as pd
 import plotly.express as px
 
+from utils.tracing import traced
+
+@traced
 def overview_vote_ratio(pivoted_df):
     # Plot horizontal stacked bar with Plotly Express
     fig = px.bar(
@@ -0,0 +1,33 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from utils.tracing import traced
+
+@traced
+def party_absence_chart(party_df, color='#d62728'):
+    """
+    Horizontal bar of each party's absence rate over a date window.
+    party_df is AbsenceIndex.by_party() (party, members, TOTAL, ABSENT, size).
+    """
+    fig = go.Figure(go.Bar(
+        x=party_df['size'],
+        y=party_df['party'],
+        orientation='h',
+        marker_color=color,
+        customdata=np.stack([party_df['ABSENT'], party_df['TOTAL'], party_df['members']], axis=1),
+        hovertemplate=('<b>%{y}</b><br>ลา / ขาดลงมติ %{customdata[0]:,.0f} จาก %{customdata[1]:,.0f} ครั้ง (%{x:.1%})'
+                       '<br>สมาชิก %{customdata[2]:,.0f} คน<extra></extra>'),
+    ))
+
+    fig.update_layout(
+        height=max(200, 24 * len(party_df) + 60),
+        margin=dict(l=0, r=0, t=0, b=0),
+
+        xaxis=dict(title='', tickformat='.0%', fixedrange=True),
+        yaxis=dict(title='', autorange='reversed', fixedrange=True),
+
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+
+    return fig
@@ -0,0 +1,49 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from utils.tracing import traced
+
+@traced
+def party_vote_breakdown(party_df, color_df, normalize=False):
+    """
+    Horizontal stacked bar per party. party_df is voter_party x option vote
+    counts for one bill (VoteIndex.party_tally), normalize=True shows each
+    party's votes as proportions instead of counts.
+    """
+    counts = party_df.reindex(columns=color_df['option'], fill_value=0).to_numpy(dtype=np.float64)
+    totals = counts.sum(axis=1)
+
+    # Largest parties on top
+    order = np.argsort(-totals, kind='stable')
+    counts, totals = counts[order], totals[order]
+    parties = party_df.index.to_numpy()[order]
+    values = counts / np.maximum(totals, 1)[:, None] if normalize else counts
+
+    fig = go.Figure()
+    for i, (option, color) in enumerate(zip(color_df['option'], color_df['color'])):
+        fig.add_trace(go.Bar(
+            x=values[:, i],
+            y=parties,
+            orientation='h',
+            name=option,
+            marker_color=color,
+            customdata=np.stack([counts[:, i], totals], axis=1),
+            hovertemplate=(f'<b>%{{y}}</b><br>{option}: %{{customdata[0]:,.0f}} จาก %{{customdata[1]:,.0f}} เสียง'
+                           + (' (%{x:.1%})' if normalize else '') + '<extra></extra>'),
+        ))
+
+    fig.update_layout(
+        barmode='stack',
+        height=max(200, 28 * len(parties) + 80),
+        margin=dict(l=0, r=0, t=0, b=0),
+
+        xaxis=dict(title='', tickformat='.0%' if normalize else ',d', range=[0, 1] if normalize else None, fixedrange=True),
+        yaxis=dict(title='', autorange='reversed', fixedrange=True),
+
+        legend=dict(title='', orientation='h', yanchor='bottom', y=1, xanchor='left', x=-0.01, itemclick=False, itemdoubleclick=False),
+
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+
+    return fig
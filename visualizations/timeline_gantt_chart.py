@@ -1,8 +1,11 @@
 import plotly.express as px
 import pandas as pd
-from pythainlp.util import thai_strftime
 from datetime import datetime
 
+from utils.thai_dates import thai_strftime_array
+from utils.tracing import span, traced
+
+@traced
 def timeline_gantt_chart():
     df = pd.DataFrame([
         dict(role='สภาผู้แทนราษฎร', term='สภาผู้แทนราษฎร ชุดที่ 25', term_start=datetime(2019, 3, 24), term_end=datetime(2023, 3, 20)),
@@ -34,7 +37,8 @@ def timeline_gantt_chart():
     
     # Tick frequency: use yearly ticks to reduce crowding
     ticks = [x for i,x in enumerate(pd.date_range(start=start, end=end, freq='QS')) if i%2 == 0]  # 'YS' = Year Start
-    tick_labels = [thai_strftime(d.to_pydatetime(), '%b %Y') for d in ticks]
+    with span('thai_strftime ticks'):
+        tick_labels = list(thai_strftime_array(ticks, '%b %Y'))
     
     fig.update_xaxes(
         tickvals=ticks,
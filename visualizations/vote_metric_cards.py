@@ -1,6 +1,4 @@
-import streamlit as st
-
-def metric_card(
+def metric_card_html(
     label,
     value,
     delta=None,
@@ -10,11 +8,12 @@ def metric_card(
     border_radius_px=8,
     box_shadow=True
 ):
+    """The card's HTML, also used by the static export (utils/static_export.py)."""
     shadow = "box-shadow: 0 2px 6px rgba(0,0,0,0.08);" if box_shadow else ""
 
     # 🚨 FIX: Use 'border-left-width' and 'border-left-style' separately
     # Streamlit’s internal sanitizer can ignore shorthand `border-left: ... solid ...`
-    card = st.markdown(f"""
+    return f"""
         <div class="text" style="
             display: flex;
             flex-direction: column;
@@ -33,6 +32,11 @@ def metric_card(
             <div style="font-size: 1.6em; font-weight: 600; color: #000;">{value}</div>
              <div style="font-size: 0.8em; font-weight: 400; color: #666;">{delta}</div>
         </div>
-    """, unsafe_allow_html=True)
+    """
+
+def metric_card(label, value, delta=None, **style):
+    import streamlit as st
+
+    card = st.markdown(metric_card_html(label, value, delta, **style), unsafe_allow_html=True)
     
     return card
\ No newline at end of file